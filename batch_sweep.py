@@ -0,0 +1,234 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from beam_simulator import BeamformingSimulator
+from results_store import ResultsStore, parameters_key
+from scenario_manager import ScenarioManager
+
+# Defaults for every key of a sweep spec
+DEFAULT_SPEC = {
+    'scenarios': None,        # scenario names, None for every scenario file
+    'angle_step': 5,          # degrees between beam angles in beam_angle_range
+    'num_elements': None,     # element counts to sweep, None for the scenario's own
+    'grid_size': 400,
+    'extent': 20,
+    'precision': 'double',
+    'basis_budget_mib': 64,   # cached field basis allowed per pool process
+}
+
+# Simulator owned by each pool process, reused so that configs sharing a
+# geometry also share its cached bases
+_simulator = None
+
+
+def load_spec(filepath):
+    with open(filepath, 'r') as f:
+        spec = json.load(f)
+    unknown = set(spec) - set(DEFAULT_SPEC)
+    if unknown:
+        raise ValueError(f"Unknown sweep spec keys: {sorted(unknown)}")
+    return spec
+
+
+def expand_sweep(spec, scenario_manager):
+    # One config per scenario x element count x beam angle
+    spec = dict(DEFAULT_SPEC, **spec)
+    scenarios = scenario_manager.load_all_scenarios()
+    if spec['scenarios'] is not None:
+        scenarios = [scenario for scenario in scenarios if scenario['name'] in spec['scenarios']]
+
+    configs = []
+    for scenario in scenarios:
+        element_counts = spec['num_elements'] or [scenario['num_elements']]
+        low, high = scenario['beam_angle_range']
+        angles = np.arange(low, high + spec['angle_step'] / 2, spec['angle_step'])
+        for num_elements in element_counts:
+            for angle in angles:
+                configs.append({
+                    'id': f'{len(configs):06d}',
+                    'scenario': dict(scenario, num_elements=num_elements),
+                    'beam_angle': float(angle),
+                    'grid_size': spec['grid_size'],
+                    'extent': spec['extent'],
+                    'precision': spec['precision'],
+                    'basis_budget': spec['basis_budget_mib'] * 2**20,
+                })
+    return configs
+
+
+def run_config(config):
+    global _simulator
+    if _simulator is None:
+        _simulator = BeamformingSimulator()
+        # The pool already spreads configs over the cores
+        _simulator.num_workers = 1
+
+    start = time.perf_counter()
+    _simulator.apply_scenario(config['scenario'])
+    _simulator.set_precision(config['precision'])
+    _simulator.set_beam_angle(config['beam_angle'])
+    # Every pool process holds its own bases, the simulator default would
+    # allow cores x 768 MiB while a process only sees a few configs of a
+    # geometry in a row
+    _simulator.basis_budget = config.get('basis_budget', _simulator.basis_budget)
+    beam_profile = _simulator.compute_beam_profile()
+    interference = _simulator.compute_interference_map(config['grid_size'], config['extent'])
+    compute_time = time.perf_counter() - start
+    return config, beam_profile, interference, compute_time
+
+
+def _run_and_save(task):
+    # Results are written by the pool process, only metadata travels back
+    config, output_dir = task
+    config, beam_profile, interference, compute_time = run_config(config)
+    filename = f"{config['id']}.npz"
+    np.savez(os.path.join(output_dir, filename),
+             angles=beam_profile['x'], beam_profile=beam_profile['y'],
+             x=interference['x'], y=interference['y'], interference=interference['interference'])
+    return config, filename, compute_time
+
+
+def config_parameters(config):
+    # The parameters that identify a config's results
+    scenario = config['scenario']
+    return {
+        'scenario': scenario['name'],
+        'num_elements': scenario['num_elements'],
+        'frequency': scenario['frequency'],
+        'array_type': scenario['array_type'],
+        'beam_angle': config['beam_angle'],
+        'grid_size': config['grid_size'],
+        'extent': config['extent'],
+        'precision': config['precision'],
+    }
+
+
+def config_record(config, compute_time, **extra):
+    return dict({'id': config['id']}, **config_parameters(config), compute_time=compute_time, **extra)
+
+
+def throughput_report(compute_times, wall_time):
+    compute_times = np.array(compute_times)
+    if len(compute_times) == 0:
+        return {'configs': 0, 'wall_time': wall_time, 'configs_per_second': 0.0}
+    return {
+        'configs': len(compute_times),
+        'wall_time': wall_time,
+        'configs_per_second': len(compute_times) / wall_time,
+        'latency_p50': np.percentile(compute_times, 50),
+        'latency_p90': np.percentile(compute_times, 90),
+        'latency_p99': np.percentile(compute_times, 99),
+        'latency_max': compute_times.max(),
+    }
+
+
+def print_report(report):
+    if report.get('skipped'):
+        print(f"{report['skipped']} configs skipped, their results were already in the output directory")
+    print(f"{report['configs']} configs in {report['wall_time']:.2f} s "
+          f"({report['configs_per_second']:.2f} configs/s)")
+    if report['configs']:
+        print(f"per-config latency: p50 {report['latency_p50'] * 1e3:.1f} ms, "
+              f"p90 {report['latency_p90'] * 1e3:.1f} ms, p99 {report['latency_p99'] * 1e3:.1f} ms, "
+              f"max {report['latency_max'] * 1e3:.1f} ms")
+
+
+def completed_records(index_path):
+    # Records of the configs an earlier run wrote to results.jsonl
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path) as index:
+        return [json.loads(line) for line in index if line.strip()]
+
+
+def pending_configs(configs, done, first_id):
+    # The configs whose parameters are not in done, renumbered from first_id
+    # so that ids stay unique within an output directory across runs
+    pending = [config for config in configs if parameters_key(config_parameters(config)) not in done]
+    return [dict(config, id=f'{first_id + i:06d}') for i, config in enumerate(pending)]
+
+
+def run_sweep(configs, output_dir, workers=None, chunksize=4, output_format='store'):
+    # Spread the configs over a process pool and append every result to
+    # disk as soon as it completes. The 'store' format appends to a
+    # ResultsStore in output_dir/store, 'npz' writes one file per config.
+    # Configs whose results are already in output_dir are skipped, so an
+    # interrupted sweep resumes where it stopped.
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    compute_times = []
+    start = time.perf_counter()
+    total = len(configs)
+
+    index_path = os.path.join(output_dir, 'results.jsonl')
+    records = completed_records(index_path)
+    with open(index_path, 'a') as index:
+        if output_format == 'npz':
+            # A config is done once its file is listed in results.jsonl
+            names = list(config_parameters(configs[0])) if configs else []
+            done = {parameters_key({name: record[name] for name in names}) for record in records
+                    if os.path.exists(os.path.join(output_dir, record['file']))}
+            configs = pending_configs(configs, done, len(records))
+            tasks = [(config, output_dir) for config in configs]
+            with multiprocessing.Pool(workers) as pool:
+                for config, filename, compute_time in pool.imap_unordered(_run_and_save, tasks, chunksize=chunksize):
+                    index.write(json.dumps(config_record(config, compute_time, file=filename)) + '\n')
+                    index.flush()
+                    compute_times.append(compute_time)
+        else:
+            with ResultsStore(os.path.join(output_dir, 'store')) as store:
+                # A config is done once the store has an entry for it
+                done = {parameters_key(config_parameters(config)) for config in configs
+                        if store.lookup(config_parameters(config)) is not None}
+                configs = pending_configs(configs, done, len(records))
+                with multiprocessing.Pool(workers) as pool:
+                    for config, beam_profile, interference, compute_time in pool.imap_unordered(
+                            run_config, configs, chunksize=chunksize):
+                        entry = store.append(config_parameters(config), {
+                            'angles': beam_profile['x'], 'beam_profile': beam_profile['y'],
+                            'x': interference['x'], 'y': interference['y'],
+                            'interference': interference['interference'],
+                        })
+                        index.write(json.dumps(config_record(config, compute_time, entry=entry)) + '\n')
+                        index.flush()
+                        compute_times.append(compute_time)
+
+    report = throughput_report(compute_times, time.perf_counter() - start)
+    report['skipped'] = total - len(configs)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless beamforming parameter sweeps')
+    parser.add_argument('spec', nargs='?', help='JSON sweep spec, see DEFAULT_SPEC for its keys')
+    parser.add_argument('--output', default='sweep_results', help='directory the results are written to')
+    parser.add_argument('--scenarios-dir', default='scenarios')
+    parser.add_argument('--workers', type=int, default=None, help='pool size, all cores by default')
+    parser.add_argument('--format', choices=['store', 'npz'], default='store',
+                        help='chunked results store or one .npz per config')
+    parser.add_argument('--scenarios', nargs='+', default=None)
+    parser.add_argument('--angle-step', type=float, default=None)
+    parser.add_argument('--num-elements', type=int, nargs='+', default=None)
+    parser.add_argument('--grid-size', type=int, default=None)
+    parser.add_argument('--precision', choices=['double', 'single'], default=None)
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec) if args.spec else {}
+    # Command line options override the spec file
+    for key in ('scenarios', 'angle_step', 'num_elements', 'grid_size', 'precision'):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+
+    configs = expand_sweep(spec, ScenarioManager(args.scenarios_dir))
+    print(f"Running {len(configs)} configs on {args.workers or os.cpu_count()} processes")
+    report = run_sweep(configs, args.output, args.workers, output_format=args.format)
+    print_report(report)
+
+
+if __name__ == '__main__':
+    main()
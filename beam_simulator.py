@@ -1,7 +1,50 @@
+import os
+import time
+import warnings
+from collections import namedtuple
+
 import numpy as np
-import scipy.signal as signal
+
+from instrumentation import Instrumentation
+
+# Real and complex dtypes used for each precision mode
+PRECISIONS = {
+    'double': (np.float64, np.complex128),
+    'single': (np.float32, np.complex64),
+}
+
+# One step of a steering scan, see BeamformingSimulator.iter_scan
+ScanFrame = namedtuple('ScanFrame', ['index', 'beam_angle', 'beam_profile', 'interference', 'dropped', 'compute_time'])
+
+# numba_kernels module once looked up, None when numba is not installed
+_numba_kernels = False
+
+
+def load_numba_kernels():
+    # numba is optional, it is only imported when a backend first asks for it
+    global _numba_kernels
+    if _numba_kernels is False:
+        try:
+            import numba_kernels
+        except ImportError:
+            numba_kernels = None
+        _numba_kernels = numba_kernels
+    return _numba_kernels
+
+
+def scan_angles(low, high, step=1):
+    # One back-and-forth sweep from low to high, for use with repeat=True
+    forward = np.arange(low, high + step / 2, step, dtype=float)
+    return np.concatenate([forward, forward[-2:0:-1]])
+
 
 class BeamformingSimulator:
+    # Attributes that fully describe a simulation
+    PARAMETERS = ('num_elements', 'frequency', 'wavelength', 'element_spacing',
+                  'array_type', 'curvature_radius', 'beam_angle', 'precision',
+                  'num_rows', 'row_spacing', 'elevation_angle', 'taper', 'sidelobe_level',
+                  'element_weights', 'failed_elements')
+
     def __init__(self):
         # Default parameters
         self.num_elements = 16
@@ -10,15 +53,117 @@ class BeamformingSimulator:
         self.element_spacing = self.wavelength / 2
         self.beam_angle = 0
         self.array_type = 'linear'
+        # Planar arrays: num_elements columns along y times num_rows rows
+        # along z, rows spaced like the columns unless row_spacing is set.
+        # elevation_angle steers them out of the horizontal plane.
+        self.num_rows = 1
+        self.row_spacing = None
+        self.elevation_angle = 0
+        # Element weighting: taper is 'uniform', 'hamming', 'chebyshev' or
+        # 'taylor', the last two with sidelobes sidelobe_level dB down.
+        # element_weights, when set, multiplies it with one complex weight
+        # per element, and the failed_elements indices are silenced.
+        self.taper = 'uniform'
+        self.sidelobe_level = 30
+        self.element_weights = None
+        self.failed_elements = ()
+        # Weight changes to at most this many elements update the field of
+        # an earlier map on the same grid instead of re-summing every element
+        self.incremental_limit = 16
+        # Complex fields of the last maps by grid, with their element
+        # coefficients, one per field basis slot (the preview and the refined
+        # grid). They count against basis_budget together with the bases.
+        self._last_fields = {}
+        # Largest phase error, in radians, for which compute_volume's 'auto'
+        # method uses the Fresnel approximation
+        self.fresnel_tolerance = 0.1
+        # Element x point evaluations beyond which 'auto' refuses the exact
+        # volume method instead of running for minutes
+        self.exact_volume_limit = 2**31
+        # Wideband pulses: a Gaussian spectrum whose amplitude falls to half
+        # at +-fractional_bandwidth / 2 around the carrier, sampled by
+        # num_frequencies bins. steering_mode 'phase' applies the carrier
+        # steering phases to every bin, so the beam squints with frequency,
+        # 'delay' steers with true time delays.
+        self.fractional_bandwidth = 0.5
+        self.num_frequencies = 16
+        self.steering_mode = 'phase'
+        # Scratch memory allowed for field evaluation, in bytes
+        self.memory_budget = 32 * 2**20
+        # Numeric precision of positions, phases and fields
+        self.precision = 'double'
+        # Memory allowed for the cached elements x pixels field basis, in bytes
+        self.basis_budget = 768 * 2**20
+        # Field bases kept at once within basis_budget, one per grid
+        self.field_basis_slots = 2
+        # Number of viewing angles in a beam profile
+        self.profile_resolution = 1000
+        # Beam profile engine: 'direct' summation, 'fft' for uniform linear
+        # arrays, or 'auto' to use the FFT once elements x angles reaches
+        # fft_threshold
+        self.beam_profile_engine = 'auto'
+        self.fft_threshold = 2**19
+        # FFT length per element, the array factor is interpolated between bins
+        self.fft_oversample = 32
+        # Compute backend: 'numpy', 'numba' for the fused compiled kernels,
+        # or 'auto' to use numba when it is installed
+        self.backend = 'auto'
+        # Threads sharing the field evaluation of one map, None for one per core
+        self.num_workers = None
+        self._executor = None
+        self._executor_workers = 0
+        # Steering-independent bases of the current geometry, by name, each a
+        # list of (key, basis) pairs
+        self._bases = {}
+        # Per-stage timings, disabled unless a caller switches them on
+        self.instrumentation = Instrumentation()
         
     def set_beam_angle(self, angle):
         self.beam_angle = angle
 
+    def get_parameters(self):
+        return {name: getattr(self, name, None) for name in self.PARAMETERS}
+
+    def set_parameters(self, parameters):
+        for name, value in parameters.items():
+            setattr(self, name, value)
+
+    def set_frequency(self, frequency):
+        # Update wavelength and element spacing
+        self.frequency = frequency
+        self.wavelength = 3e8 / frequency
+        self.element_spacing = self.wavelength / 2
+
+    def apply_scenario(self, scenario_data):
+        # Configure the array from a scenario file, the same way the UI does
+        self.num_elements = scenario_data['num_elements']
+        self.array_type = scenario_data['array_type'].lower()
+        self.num_rows = scenario_data.get('num_rows', 1)
+        self.curvature_radius = (self.num_elements - 1) * 0.5 / np.pi
+        self.set_frequency(scenario_data['frequency'])
+
+    def set_precision(self, precision):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {list(PRECISIONS)}")
+        self.precision = precision
+
+    @property
+    def real_dtype(self):
+        return PRECISIONS[self.precision][0]
+
+    @property
+    def complex_dtype(self):
+        return PRECISIONS[self.precision][1]
+
     def get_element_positions(self):
         if self.array_type == 'linear':
             # Linear array positions
             x_positions = np.arange(-(self.num_elements - 1) / 2, (self.num_elements) / 2) * self.element_spacing
             y_positions = np.zeros_like(x_positions)
+        elif self.array_type == 'planar':
+            # Array face seen from boresight, columns along x and rows along y
+            lateral, elevation = self.get_planar_axes()
+            x_positions, y_positions = (axis.ravel() for axis in np.meshgrid(lateral, elevation, indexing='ij'))
         else:
             # Curved array positions
             # arc_length = (self.num_elements - 1) * self.element_spacing
@@ -32,76 +177,240 @@ class BeamformingSimulator:
             
             x_positions = curvature_radius * np.cos(theta)
             y_positions = curvature_radius * np.sin(theta)
-        return x_positions, y_positions
+        return x_positions.astype(self.real_dtype), y_positions.astype(self.real_dtype)
 
-    def compute_beam_profile(self):
-        # Compute viewing angles
-        theta = np.linspace(-np.pi, np.pi, 1000)
-        
-        # Get element positions
+    def get_profile_offsets(self):
+        # Element offsets used for the far-field path difference. The curved
+        # array is referenced to the centre of its arc, the linear array only
+        # contributes along x.
+        if self.array_type == 'planar':
+            # In the horizontal cut every row sees the same lateral path
+            # differences, the rows add up column by column
+            lateral = self.get_planar_axes()[0]
+            return lateral, np.zeros_like(lateral)
         x_positions, y_positions = self.get_element_positions()
-        
-        # Convert beam steering angle to radians
-        steering_angle = np.deg2rad(self.beam_angle)
-        
-        # Initialize results array
-        results = np.zeros_like(theta)
-        
-        # Compute contribution from each element
-        for angle_idx, view_angle in enumerate(theta):
-            # For each viewing angle, compute the phase difference from each element
-            total_field = 0
-            
-            # Reference point for phase calculation (could be center of array)
-            # x_ref = 0
-            # y_ref = 0 if self.array_type == 'linear' else self.curvature_radius
-            
-            for x_pos, y_pos in zip(x_positions, y_positions):
-                # Compute path length difference
-                if self.array_type == 'linear':
-                    # For linear array
-                    path_diff = x_pos * (np.sin(view_angle) - np.sin(steering_angle))
-                else:
-                    # For curved array
-                    # Calculate path difference considering curved geometry
-                    dx = x_pos
-                    dy = y_pos - self.curvature_radius
-                    path_diff = (dx * np.sin(view_angle) + dy * np.cos(view_angle) - 
-                               (dx * np.sin(steering_angle) + dy * np.cos(steering_angle)))
-                
-                # Compute phase
-                phase = 2 * np.pi * path_diff / self.wavelength
-                
-                # Add contribution from this element
-                total_field += np.exp(1j * phase)
-            
-            # Store magnitude of total field
-            results[angle_idx] = np.abs(total_field)
-        
-        # Normalize and convert to dB
-        results = 20 * np.log10(results / np.max(results))
-        
+        if self.array_type == 'linear':
+            return x_positions, np.zeros_like(x_positions)
+        return x_positions, y_positions - self.curvature_radius
+
+    def get_element_count(self):
+        return self.num_elements * (self.num_rows if self.array_type == 'planar' else 1)
+
+    def get_taper(self):
+        # Real amplitude taper in get_element_positions order. A planar array
+        # is tapered along both axes, columns x rows flattened.
+        if self.taper == 'uniform':
+            return np.ones(self.get_element_count())
+        if self.taper not in ('hamming', 'chebyshev', 'taylor'):
+            raise ValueError(f"Unknown taper '{self.taper}', expected 'uniform', 'hamming', 'chebyshev' or 'taylor'")
+        # Only imported once a taper is actually used
+        from scipy.signal import windows
+
+        def window(length):
+            if length == 1:
+                return np.ones(1)
+            if self.taper == 'hamming':
+                return windows.hamming(length)
+            if self.taper == 'chebyshev':
+                with warnings.catch_warnings():
+                    # A spectral analysis caveat, it does not apply to arrays
+                    warnings.simplefilter('ignore', UserWarning)
+                    return windows.chebwin(length, self.sidelobe_level)
+            return windows.taylor(length, sll=self.sidelobe_level, norm=False)
+
+        if self.array_type == 'planar':
+            return np.outer(window(self.num_elements), window(self.num_rows)).ravel()
+        return window(self.num_elements)
+
+    def get_element_weights(self):
+        # Complex weight of every element, in get_element_positions order
+        # (the field positions of linear and curved arrays use the same order)
+        weights = self.get_taper().astype(self.complex_dtype)
+        if self.element_weights is not None:
+            if len(self.element_weights) != len(weights):
+                raise ValueError(f"element_weights has {len(self.element_weights)} entries, "
+                                 f"the array has {len(weights)} elements")
+            weights *= np.asarray(self.element_weights, dtype=self.complex_dtype)
+        if len(self.failed_elements):
+            weights[np.asarray(self.failed_elements, dtype=np.intp)] = 0
+        return weights
+
+    def set_element_weight(self, index, weight):
+        # The weights are replaced rather than edited, an earlier
+        # get_parameters() keeps the values it returned
+        weights = np.ones(self.get_element_count(), dtype=complex) if self.element_weights is None \
+            else np.array(self.element_weights, dtype=complex)
+        weights[index] = weight
+        self.element_weights = weights
+
+    def set_element_failed(self, index, failed=True):
+        failed_elements = set(self.failed_elements)
+        if failed:
+            failed_elements.add(int(index))
+        else:
+            failed_elements.discard(int(index))
+        self.failed_elements = tuple(sorted(failed_elements))
+
+    def get_profile_element_weights(self):
+        # Weights of the elements seen by the beam profile. In the horizontal
+        # cut (v = 0) of a planar array the rows of a column add up with
+        # their elevation steering phases. The profile sums
+        # exp(+1j * k * path) where the maps sum exp(-1j * k * path), hence
+        # the conjugate.
+        weights = self.get_element_weights()
+        if self.array_type == 'planar':
+            z_positions = self.get_planar_axes()[1]
+            v = self.get_steering_cosines()[1]
+            k = 2 * np.pi / self.wavelength
+            rows = np.exp(1j * k * z_positions * v)
+            return np.conj(weights.reshape(self.num_elements, self.num_rows) @ rows).astype(self.complex_dtype)
+        return np.conj(weights)
+
+    def get_profile_weights(self, dx, dy, beam_angle):
+        # Steering weights remove the path difference towards the beam angle,
+        # on top of the element weights. An array of angles gives one row of
+        # weights per angle.
+        k = self.real_dtype(2 * np.pi / self.wavelength)
+        if self.array_type == 'planar':
+            # Lateral steering towards the direction cosine u of the steering
+            # direction, which the elevation angle shrinks
+            u = np.asarray(self.get_steering_cosines(beam_angle)[0], dtype=self.real_dtype)[..., None]
+            steering = np.exp(-1j * k * dx * u)
+        else:
+            steering_angle = np.deg2rad(np.asarray(beam_angle, dtype=self.real_dtype))[..., None]
+            steering = np.exp(-1j * k * (dx * np.sin(steering_angle) + dy * np.cos(steering_angle)))
+        return steering * self.get_profile_element_weights()
+
+    def compute_beam_profile(self):
+        return self._compute_beam_profiles(self.beam_angle)
+
+    def compute_beam_profiles(self, beam_angles):
+        # Beam profiles for many steering angles in one pass, stacked as
+        # (steering angles x viewing angles)
+        beam_angles = np.asarray(beam_angles, dtype=float)
+        profiles = self._compute_beam_profiles(beam_angles)
+        profiles['beam_angles'] = beam_angles
+        return profiles
+
+    def _compute_beam_profiles(self, beam_angle):
+        stage = self.instrumentation.stage
+
+        with stage('beam_profile.geometry'):
+            # Compute viewing angles
+            theta = np.linspace(-np.pi, np.pi, self.profile_resolution, dtype=self.real_dtype)
+
+            # Element offsets for the current geometry
+            dx, dy = self.get_profile_offsets()
+            k = self.real_dtype(2 * np.pi / self.wavelength)
+            use_fft = self.use_fft_profile(dx)
+            kernels = None if use_fft else self.get_kernels()
+
+            if not use_fft and kernels is None:
+                # Array manifold (angles x elements): phase of every element
+                # seen from every viewing angle. It does not depend on the
+                # steering angle, so it is only rebuilt when the geometry or
+                # frequency change.
+                manifold = self._cached_basis(
+                    'manifold', (dx.tobytes(), dy.tobytes(), k, dx.dtype.name, len(theta)),
+                    lambda: np.exp(1j * k * (np.outer(np.sin(theta), dx) + np.outer(np.cos(theta), dy))))
+
+        with stage('beam_profile.phase'):
+            weights = self.get_profile_weights(dx, dy, beam_angle)
+
+        with stage('beam_profile.accumulation'):
+            if use_fft:
+                total_field = self._fft_array_factor(dx, theta, weights)
+            elif kernels is not None:
+                # Fused per-angle sum, no manifold is materialized
+                total_field = np.empty((len(np.atleast_2d(weights)), len(theta)), dtype=self.complex_dtype)
+                kernels.array_factor(theta, dx, dy, np.atleast_2d(weights), float(k), total_field)
+                if np.ndim(weights) == 1:
+                    total_field = total_field[0]
+            else:
+                # Sum the contributions of all elements for every angle at once
+                total_field = (manifold @ weights.T).T
+
+        with stage('beam_profile.normalization'):
+            return self._beam_profile_from_field(theta, total_field)
+
+    def get_kernels(self):
+        # Compiled kernels for the selected backend, None for NumPy
+        if self.backend == 'numpy':
+            return None
+        if self.backend not in ('auto', 'numba'):
+            raise ValueError(f"Unknown backend: {self.backend}")
+        kernels = load_numba_kernels()
+        if kernels is None and self.backend == 'numba':
+            raise ValueError("The numba backend needs numba to be installed")
+        return kernels
+
+    def use_fft_profile(self, dx):
+        # The FFT engine needs uniformly spaced elements on a line, every
+        # other geometry falls back to direct summation
+        if self.beam_profile_engine == 'direct' or self.array_type == 'curved' or len(dx) < 2:
+            return False
+        spacing = np.diff(dx)
+        if not np.allclose(spacing, spacing[0]):
+            return False
+        return self.beam_profile_engine == 'fft' or len(dx) * self.profile_resolution >= self.fft_threshold
+
+    def _fft_array_factor(self, dx, theta, weights):
+        # For a uniform linear array the array factor is the DFT of the
+        # element weights at psi = k * d * sin(theta), up to a phase that
+        # does not change its magnitude. A zero-padded FFT samples it on a
+        # fine uniform psi grid, which is then interpolated (cubic Lagrange,
+        # periodic in psi) at the psi of every viewing angle.
+        spacing = float(dx[1] - dx[0])
+        size = 1 << int(np.ceil(np.log2(len(dx) * self.fft_oversample)))
+        k = 2 * np.pi / self.wavelength
+
+        # Fractional FFT bin of every viewing angle
+        psi = k * spacing * np.sin(theta.astype(np.float64))
+        position = np.mod(psi / (2 * np.pi) * size, size)
+        index = np.floor(position).astype(np.intp)
+        t = position - index
+        coefficients = (
+            -t * (t - 1) * (t - 2) / 6,
+            (t + 1) * (t - 1) * (t - 2) / 2,
+            -(t + 1) * t * (t - 2) / 2,
+            (t + 1) * t * (t - 1) / 6,
+        )
+        taps = [(index + offset) % size for offset in (-1, 0, 1, 2)]
+
+        single = np.ndim(weights) == 1
+        weights = np.atleast_2d(weights)
+        total_field = np.empty((len(weights), len(theta)), dtype=self.complex_dtype)
+        # Bands of weight rows keep the spectra within memory_budget
+        rows_per_band = max(1, int(self.memory_budget // (size * 16)))
+        for start in range(0, len(weights), rows_per_band):
+            spectrum = np.fft.ifft(weights[start:start + rows_per_band], n=size, axis=-1) * size
+            total_field[start:start + rows_per_band] = sum(
+                coefficient * spectrum[:, tap] for coefficient, tap in zip(coefficients, taps))
+        return total_field[0] if single else total_field
+
+    def _beam_profile_from_field(self, theta, total_field):
+        # Store magnitude of total field
+        results = np.abs(total_field)
+
+        # Normalize and convert to dB. A silent array, every element failed,
+        # gives a profile at the floor.
+        peak = np.max(results, axis=-1, keepdims=True)
+        with np.errstate(divide='ignore'):
+            results = 20 * np.log10(results / np.where(peak > 0, peak, 1))
+
         # Filter out values below -60 dB
         results = np.maximum(results, -60)
-        
+
         # Convert to linear scale for magnitude plot
         magnitude = 1 + (results / 60)  # Scale to 0-1 range
-        
+
         return {
             'x': np.rad2deg(theta),
             'y': magnitude
         }
 
-    def compute_interference_map(self):
-        # Define the grid with appropriate range to show main lobe
-        x = np.linspace(-20, 20, 400)  # Increased range in x direction
-        y = np.linspace(-20, 20, 400)
-        X, Y = np.meshgrid(x, y)
-        
-        # Wave parameters
-        k = 2 * np.pi / self.wavelength
-        
-        # Get element positions based on array type
+    def get_field_element_positions(self):
+        # Element positions used for the interference map
         if self.array_type == 'linear':
             # Linear array positions
             num_elements = self.num_elements
@@ -113,47 +422,830 @@ class BeamformingSimulator:
             angles = np.linspace(0, 2 * np.pi, self.num_elements, endpoint=False)
             x_positions = self.curvature_radius * np.cos(angles)
             y_positions = self.curvature_radius * np.sin(angles)
-        
-        # Calculate steering phase shifts
-        steering_angle_rad = np.deg2rad(self.beam_angle)
-        # phase_shifts = k * element_positions * np.sin(steering_angle_rad)
-        
-        # Initialize field
-        field = np.zeros_like(X, dtype=complex)
-        
-        # For curved array, calculate center of the circle as reference
-        x_center = 0
-        y_center = 0
-        
-        # Calculate field from each element
-        for x_pos, y_pos in zip(x_positions, y_positions):
-            # Calculate distances from this element to all points
-            distances = np.sqrt((X - x_pos)**2 + (Y - y_pos)**2)
-            
-            if self.array_type == 'linear':
-                # Linear array phase calculation
-                phase_shift = k * y_pos * np.sin(steering_angle_rad)
+        return x_positions.astype(self.real_dtype), y_positions.astype(self.real_dtype)
+
+    def get_field_phase_shifts(self, x_positions, y_positions, beam_angle=None):
+        # Calculate steering phase shifts, one row per angle for an array of
+        # beam angles
+        beam_angle = self.beam_angle if beam_angle is None else beam_angle
+        k = self.real_dtype(2 * np.pi / self.wavelength)
+        steering_angle_rad = np.deg2rad(np.asarray(beam_angle, dtype=self.real_dtype))[..., None]
+
+        if self.array_type == 'linear':
+            # Linear array phase calculation
+            return k * y_positions * np.sin(steering_angle_rad)
+
+        # Curved array phase calculation: angle of each element relative to
+        # the centre of the circle
+        element_angles = np.arctan2(y_positions, x_positions)
+        return k * self.curvature_radius * np.cos(element_angles - steering_angle_rad)
+
+    def get_grid_axes(self, grid_size=400, extent=20, x_range=None, y_range=None):
+        # 1-D axes of the map grid. grid_size is a single count or (ny, nx),
+        # the region defaults to +-extent in both directions.
+        ny, nx = (grid_size, grid_size) if np.isscalar(grid_size) else grid_size
+        x_range = (-extent, extent) if x_range is None else x_range
+        y_range = (-extent, extent) if y_range is None else y_range
+        return np.linspace(x_range[0], x_range[1], nx), np.linspace(y_range[0], y_range[1], ny)
+
+    def adaptive_grid_size(self, x_range, y_range, max_size, samples_per_wavelength=4, min_size=32,
+                           basis_fraction=None):
+        # Grid size (ny, nx) for a region, tied to the wavelength. The finest
+        # interference fringes have a period of half a wavelength, so four
+        # samples per wavelength resolve them. There is no point in going
+        # beyond max_size, typically the display pixels of the region.
+        step = self.wavelength / samples_per_wavelength
+        max_ny, max_nx = max_size
+        nx = int(np.clip(np.ceil(abs(x_range[1] - x_range[0]) / step) + 1, min_size, max_nx))
+        ny = int(np.clip(np.ceil(abs(y_range[1] - y_range[0]) / step) + 1, min_size, max_ny))
+
+        if basis_fraction is not None and self.array_type != 'planar':
+            # Shrink both axes so that the field basis of the grid, and the
+            # field kept for incremental updates, fit in basis_fraction of
+            # basis_budget. Re-steering then stays a matrix product instead
+            # of falling back to streaming.
+            pixel_bytes = (self.get_element_count() + 1) * np.dtype(self.complex_dtype).itemsize
+            max_pixels = basis_fraction * self.basis_budget // pixel_bytes
+            if ny * nx > max_pixels:
+                scale = np.sqrt(max_pixels / (ny * nx))
+                ny, nx = max(min_size, int(ny * scale)), max(min_size, int(nx * scale))
+        return ny, nx
+
+    def compute_interference_map(self, grid_size=400, extent=20, dtype=None, x_range=None, y_range=None):
+        # The accumulator follows the simulator precision unless overridden
+        dtype = self.complex_dtype if dtype is None else dtype
+
+        # Define the grid with appropriate range to show main lobe. Only the
+        # 1-D axes are kept, the 2-D grid is produced by broadcasting.
+        x, y = self.get_grid_axes(grid_size, extent, x_range, y_range)
+
+        return {
+            'x': x,
+            'y': y,
+            'interference': self._interference_map(x, y, dtype)
+        }
+
+    def _interference_map(self, x, y, dtype, beam_angle=None, out=None, field=None):
+        # Normalized intensity over the x, y grid. out and field are optional
+        # preallocated (len(y), len(x)) intensity and complex field buffers.
+        # Wave parameters
+        k = 2 * np.pi / self.wavelength
+        stage = self.instrumentation.stage
+
+        if self.array_type == 'planar':
+            with stage('interference_map.accumulation'):
+                if out is None:
+                    out = np.empty((len(y), len(x)), dtype=np.finfo(dtype).dtype)
+                self._planar_slice_intensity(x, y, dtype, beam_angle, out)
+            with stage('interference_map.normalization'):
+                return self._normalize_intensity(out)
+
+        with stage('interference_map.geometry'):
+            x_positions, y_positions = self.get_field_element_positions()
+            basis = self.get_field_basis(x, y, x_positions, y_positions, k, dtype)
+
+        with stage('interference_map.phase'):
+            # Steering phase and element weight of every element
+            phase_shifts = self.get_field_phase_shifts(x_positions, y_positions, beam_angle)
+            weights = (np.exp(1j * phase_shifts) * self.get_element_weights()).astype(dtype)
+
+        with stage('interference_map.accumulation'):
+            # Only maps computed into their own field buffer are kept, a
+            # caller's buffer is reused behind our back
+            grid_key = (x.tobytes(), y.tobytes(), x_positions.tobytes(), y_positions.tobytes(), k, np.dtype(dtype).name)
+            keep = field is None
+            updated = self._update_last_field(grid_key, weights, x, y, x_positions, y_positions, k, basis) \
+                if keep else None
+            if updated is not None:
+                field = updated
+            elif basis is not None:
+                # Re-steering only changes the per-element weights
+                if field is None:
+                    field = np.empty((len(y), len(x)), dtype=dtype)
+                np.matmul(weights, basis, out=field.reshape(-1))
             else:
-                # Curved array phase calculation
-                # Calculate the angle of the element relative to center
-                element_angle = np.arctan2(y_pos - y_center, x_pos - x_center)
-                
-                # Calculate phase shift based on steering angle and element position
-                phase_shift = k * self.curvature_radius * np.cos(element_angle - steering_angle_rad)
-            
-            # Add contribution from this element with phase shift
-            field += np.exp(1j * (k * distances + phase_shift))
-        
-        # Calculate intensity
-        intensity = np.abs(field)**2
-        # Normalize the intensity
-        intensity = intensity / np.max(intensity)
-        # Log scale normalization to better show the pattern
-        intensity = np.log10(intensity + 1)  # Add 1 to avoid log(0)
-        intensity = intensity / np.max(intensity)
-        
+                field = self._accumulate_field(x, y, x_positions, y_positions, weights, k, dtype, out=field)
+            if keep:
+                self._keep_last_field(grid_key, weights, field)
+
+        with stage('interference_map.normalization'):
+            # Calculate intensity
+            intensity = np.abs(field, out=out)
+            del field
+            intensity **= 2
+            return self._normalize_intensity(intensity)
+
+    def iter_scan(self, beam_angles, grid_size=400, extent=20, dtype=None, x_range=None, y_range=None,
+                  repeat=False, fps=None, buffers=1):
+        # Yields a ScanFrame per steering angle of beam_angles, cycling
+        # through them forever with repeat. Only one frame is computed at a
+        # time and maps are written into a ring of `buffers` preallocated
+        # arrays, so a frame's interference array is overwritten `buffers`
+        # frames later; copy it to keep it.
+        #
+        # Without fps the consumer sets the pace: the next frame is only
+        # computed when it is asked for. With fps the scan follows the wall
+        # clock, frame i is due i / fps seconds after the start. The
+        # generator waits when the consumer is early and skips the angles
+        # whose time has passed when it falls behind, counting them in
+        # `dropped`.
+        dtype = self.complex_dtype if dtype is None else dtype
+        beam_angles = np.atleast_1d(np.asarray(beam_angles, dtype=float))
+        x, y = self.get_grid_axes(grid_size, extent, x_range, y_range)
+        intensities = [np.empty((len(y), len(x)), dtype=np.finfo(dtype).dtype) for _ in range(buffers)]
+        field = np.empty((len(y), len(x)), dtype=dtype)
+
+        start = time.perf_counter()
+        index = dropped = produced = 0
+        while repeat or index < len(beam_angles):
+            if fps is not None:
+                due = (time.perf_counter() - start) * fps
+                latest = int(due) if repeat else min(int(due), len(beam_angles) - 1)
+                if latest > index:
+                    dropped += latest - index
+                    index = latest
+                elif index > due:
+                    time.sleep((index - due) / fps)
+
+            frame_start = time.perf_counter()
+            beam_angle = beam_angles[index % len(beam_angles)]
+            beam_profile = self._compute_beam_profiles(beam_angle)
+            interference = {
+                'x': x,
+                'y': y,
+                'interference': self._interference_map(x, y, dtype, beam_angle, intensities[produced % buffers], field)
+            }
+            yield ScanFrame(index, float(beam_angle), beam_profile, interference, dropped,
+                            time.perf_counter() - frame_start)
+            index += 1
+            produced += 1
+
+    def compute_interference_maps(self, beam_angles, grid_size=400, extent=20, dtype=None, x_range=None, y_range=None):
+        # Interference maps for many steering angles, stacked as
+        # (steering angles x H x W). The geometry basis is built once for the
+        # whole batch and every band of angles is a single matrix product.
+        dtype = self.complex_dtype if dtype is None else dtype
+        beam_angles = np.asarray(beam_angles, dtype=float)
+
+        x, y = self.get_grid_axes(grid_size, extent, x_range, y_range)
+        k = 2 * np.pi / self.wavelength
+        intensity = np.empty((len(beam_angles), len(y), len(x)), dtype=np.finfo(dtype).dtype)
+
+        if self.array_type == 'planar':
+            for beam_angle, angle_intensity in zip(beam_angles, intensity):
+                self._planar_slice_intensity(x, y, dtype, beam_angle, angle_intensity)
+            return {
+                'x': x,
+                'y': y,
+                'beam_angles': beam_angles,
+                'interference': self._normalize_intensity(intensity)
+            }
+
+        x_positions, y_positions = self.get_field_element_positions()
+        phase_shifts = self.get_field_phase_shifts(x_positions, y_positions, beam_angles)
+        weights = (np.exp(1j * phase_shifts) * self.get_element_weights()).astype(dtype)
+        pixels = intensity.reshape(len(beam_angles), -1)
+
+        basis = self.get_field_basis(x, y, x_positions, y_positions, k, dtype)
+        if basis is not None:
+            self._project_basis(weights, basis, pixels)
+        elif self.get_kernels() is not None:
+            # Fused kernel per steering angle into one reused field buffer
+            field = np.empty((len(y), len(x)), dtype=dtype)
+            for angle_pixels, angle_weights in zip(pixels, weights):
+                self._accumulate_field(x, y, x_positions, y_positions, angle_weights, k, dtype, out=field)
+                np.abs(field.ravel(), out=angle_pixels)
+            pixels **= 2
+        else:
+            # Build the basis one band of rows at a time within memory_budget
+            row_bytes = len(x_positions) * len(x) * np.dtype(dtype).itemsize
+            rows_per_tile = max(1, int(self.memory_budget // row_bytes))
+            for row_start in range(0, len(y), rows_per_tile):
+                y_tile = y[row_start:row_start + rows_per_tile]
+                tile_basis = self._build_field_basis(x, y_tile, x_positions, y_positions, k, dtype)
+                tile_pixels = slice(row_start * len(x), (row_start + len(y_tile)) * len(x))
+                self._project_basis(weights, tile_basis, pixels[:, tile_pixels])
+
         return {
-            'X': X,
-            'Y': Y,
-            'interference': intensity
+            'x': x,
+            'y': y,
+            'beam_angles': beam_angles,
+            'interference': self._normalize_intensity(intensity)
         }
+
+    def get_frequency_bins(self):
+        # Frequencies of the wideband bins and the share of the pulse energy
+        # carried by each. The bins are evenly spaced over twice the
+        # half-amplitude band, the spectrum is down 24 dB at the outer ones.
+        carrier = 3e8 / self.wavelength
+        if self.num_frequencies < 1:
+            raise ValueError("num_frequencies must be at least 1")
+        if self.num_frequencies == 1 or self.fractional_bandwidth == 0:
+            return np.array([carrier]), np.ones(1)
+        if not 0 < self.fractional_bandwidth < 1:
+            raise ValueError("fractional_bandwidth must be between 0 and 1")
+        offsets = np.linspace(-1, 1, self.num_frequencies) * self.fractional_bandwidth
+        sigma = self.fractional_bandwidth / (2 * np.sqrt(2 * np.log(2)))
+        power = np.exp(-(offsets / sigma) ** 2)
+        return carrier * (1 + offsets), power / power.sum()
+
+    def _steering_terms(self, phase_shifts, k):
+        # Split the carrier steering phases into a path length, which every
+        # bin scales by its own wavenumber, and a phase shared by all bins
+        if self.steering_mode == 'delay':
+            # A time delay is a larger phase at a higher frequency
+            return phase_shifts / k, np.zeros_like(phase_shifts)
+        if self.steering_mode == 'phase':
+            return np.zeros_like(phase_shifts), phase_shifts
+        raise ValueError(f"Unknown steering mode: {self.steering_mode}")
+
+    def compute_wideband_beam_profile(self, beam_angle=None):
+        # Beam profile of the pulse energy summed over the frequency bins.
+        # The path of every element towards every viewing angle is computed
+        # once for all bins.
+        beam_angle = self.beam_angle if beam_angle is None else beam_angle
+        stage = self.instrumentation.stage
+
+        with stage('wideband_profile.geometry'):
+            theta = np.linspace(-np.pi, np.pi, self.profile_resolution, dtype=self.real_dtype)
+            frequencies, power = self.get_frequency_bins()
+            wavenumbers = (2 * np.pi * frequencies / 3e8).astype(self.real_dtype)
+            k = 2 * np.pi / self.wavelength
+            if self.array_type == 'planar':
+                # Every element on its own: under 'delay' steering the
+                # elevation steering of a row is a time delay as well, the
+                # rows of a column no longer add up to one weight
+                lateral, z_positions = self.get_planar_axes()
+                dx, z = (axis.ravel() for axis in np.meshgrid(lateral, z_positions, indexing='ij'))
+                dy = np.zeros_like(dx)
+                u, v = self.get_steering_cosines(beam_angle)
+                steering_phases = -k * (dx * u + z * v)
+                element_weights = np.conj(self.get_element_weights())
+            else:
+                dx, dy = self.get_profile_offsets()
+                steering_angle = np.deg2rad(beam_angle)
+                steering_phases = -k * (dx * np.sin(steering_angle) + dy * np.cos(steering_angle))
+                element_weights = self.get_profile_element_weights()
+            path_offsets, phase_offsets = self._steering_terms(steering_phases, k)
+
+        with stage('wideband_profile.accumulation'):
+            energy = np.zeros(len(theta), dtype=self.real_dtype)
+            # Two complex (angles x elements) arrays per band of angles
+            band_bytes = 2 * len(dx) * np.dtype(self.complex_dtype).itemsize
+            angles_per_band = max(1, int(self.memory_budget // band_bytes))
+            for start in range(0, len(theta), angles_per_band):
+                band = theta[start:start + angles_per_band]
+                paths = np.outer(np.sin(band), dx) + np.outer(np.cos(band), dy) + path_offsets
+                # Only the lowest bin and the step between bins need complex
+                # exponentials, every further bin is one multiplication
+                term = (np.exp(1j * (wavenumbers[0] * paths + phase_offsets)) * element_weights).astype(self.complex_dtype)
+                if len(wavenumbers) > 1:
+                    step = np.exp(1j * (wavenumbers[1] - wavenumbers[0]) * paths).astype(self.complex_dtype)
+                for index, bin_power in enumerate(power):
+                    energy[start:start + len(band)] += bin_power * np.abs(term.sum(axis=-1)) ** 2
+                    if index < len(power) - 1:
+                        term *= step
+
+        with stage('wideband_profile.normalization'):
+            profile = self._beam_profile_from_field(theta, np.sqrt(energy))
+            profile['frequencies'] = frequencies
+            profile['spectrum'] = power
+            return profile
+
+    def compute_pulse_energy_map(self, grid_size=400, extent=20, dtype=None, x_range=None, y_range=None,
+                                 beam_angle=None):
+        # Interference map of the pulse energy, sum over the frequency bins
+        # of the spectrum power times the bin intensity. By Parseval this is
+        # the energy of the received pulse at every pixel, what a time-domain
+        # simulation would integrate over its samples.
+        if self.array_type == 'planar':
+            raise ValueError("Pulse energy maps support linear and curved arrays")
+        dtype = self.complex_dtype if dtype is None else dtype
+        real_dtype = np.finfo(dtype).dtype
+        x, y = self.get_grid_axes(grid_size, extent, x_range, y_range)
+        stage = self.instrumentation.stage
+
+        with stage('pulse_energy_map.geometry'):
+            x_positions, y_positions = self.get_field_element_positions()
+            frequencies, power = self.get_frequency_bins()
+            wavenumbers = (2 * np.pi * frequencies / 3e8).astype(real_dtype)
+            k = 2 * np.pi / self.wavelength
+            path_offsets, phase_offsets = self._steering_terms(
+                self.get_field_phase_shifts(x_positions, y_positions, beam_angle), k)
+            element_weights = self.get_element_weights().astype(dtype)
+
+        with stage('pulse_energy_map.accumulation'):
+            energy = np.zeros((len(y), len(x)), dtype=real_dtype)
+            bands = self._bands(len(y))
+            budget = self.memory_budget / len(bands)
+            self._run_parallel(
+                lambda band: self._accumulate_energy_rows(
+                    energy[band], x.astype(real_dtype), y[band].astype(real_dtype), x_positions, y_positions,
+                    path_offsets, phase_offsets, element_weights, wavenumbers, power, dtype, budget),
+                bands)
+
+        with stage('pulse_energy_map.normalization'):
+            return {
+                'x': x,
+                'y': y,
+                'interference': self._normalize_intensity(energy),
+                'frequencies': frequencies,
+                'spectrum': power
+            }
+
+    def _accumulate_energy_rows(self, energy, x, y, x_positions, y_positions, path_offsets, phase_offsets,
+                                element_weights, wavenumbers, power, dtype, budget):
+        # Accumulate a band of rows one tile at a time within budget. Every
+        # tile holds one complex field per bin, the element distances are
+        # computed once and shared by all of them.
+        num_bins = len(wavenumbers)
+        step_k = wavenumbers[1] - wavenumbers[0] if num_bins > 1 else 0
+        # A real distance buffer, the term and step and the per-bin fields
+        tile_bytes = (1 + 2 * (num_bins + 2)) * len(x) * np.dtype(y.dtype).itemsize
+        rows_per_tile = max(1, int(budget // tile_bytes))
+        arg_buffer = np.empty((min(rows_per_tile, len(y)), len(x)), dtype=y.dtype)
+        term_buffer = np.empty(arg_buffer.shape, dtype=dtype)
+        step_buffer = np.empty_like(term_buffer)
+        field_buffer = np.empty((num_bins,) + arg_buffer.shape, dtype=dtype)
+
+        for row_start in range(0, len(y), rows_per_tile):
+            y_tile = y[row_start:row_start + rows_per_tile]
+            rows = len(y_tile)
+            arg, term, step = arg_buffer[:rows], term_buffer[:rows], step_buffer[:rows]
+            fields = field_buffer[:, :rows]
+            fields.fill(0)
+
+            for x_pos, y_pos, path_offset, phase_offset, weight in zip(
+                    x_positions, y_positions, path_offsets, phase_offsets, element_weights):
+                if weight == 0:
+                    # Failed element
+                    continue
+                # Distance from this element to every point of the tile, plus
+                # its true time delay as a path length
+                np.add(((y_tile - y_pos) ** 2)[:, None], ((x - x_pos) ** 2)[None, :], out=arg)
+                np.sqrt(arg, out=arg)
+                arg += path_offset
+
+                # Phase of the lowest bin and the phase step between bins
+                np.multiply(arg, step_k, out=step.real)
+                np.sin(step.real, out=step.imag)
+                np.cos(step.real, out=step.real)
+                arg *= wavenumbers[0]
+                arg += phase_offset
+                np.cos(arg, out=term.real)
+                np.sin(arg, out=term.imag)
+                if weight != 1:
+                    term *= weight
+
+                # Every further bin costs one complex multiplication
+                for index, field in enumerate(fields):
+                    field += term
+                    if index < num_bins - 1:
+                        term *= step
+
+            # Weight the bin intensities by the pulse spectrum
+            energy_tile = energy[row_start:row_start + rows]
+            for field, bin_power in zip(fields, power):
+                np.abs(field, out=arg)
+                arg **= 2
+                arg *= bin_power
+                energy_tile += arg
+
+    def get_planar_axes(self):
+        # Element coordinates along y (columns) and z (rows) of an array
+        # face in the x = 0 plane. A linear array is a single row.
+        if self.array_type == 'curved':
+            raise ValueError("The curved array does not have a separable planar geometry")
+        num_rows = self.num_rows if self.array_type == 'planar' else 1
+        row_spacing = self.element_spacing if self.row_spacing is None else self.row_spacing
+        y_positions = (np.arange(self.num_elements) - (self.num_elements - 1) / 2) * self.element_spacing
+        z_positions = (np.arange(num_rows) - (num_rows - 1) / 2) * row_spacing
+        return y_positions.astype(self.real_dtype), z_positions.astype(self.real_dtype)
+
+    def get_steering_cosines(self, azimuth=None, elevation=None):
+        # Direction cosines along y and z of the steering direction. The
+        # azimuth is measured from the x axis in the horizontal plane.
+        azimuth = np.deg2rad(self.beam_angle if azimuth is None else azimuth)
+        elevation = np.deg2rad(self.elevation_angle if elevation is None else elevation)
+        return np.cos(elevation) * np.sin(azimuth), np.sin(elevation)
+
+    def get_planar_weights(self, azimuth=None, elevation=None):
+        # Complex weights of a separable array, columns x rows. Steering is
+        # a linear phase along each axis, an outer product, applied on top of
+        # the element weights.
+        y_positions, z_positions = self.get_planar_axes()
+        u, v = self.get_steering_cosines(azimuth, elevation)
+        k = 2 * np.pi / self.wavelength
+        steering = np.outer(np.exp(1j * k * y_positions * u), np.exp(1j * k * z_positions * v))
+        element_weights = self.get_element_weights().reshape(len(y_positions), len(z_positions))
+        return (steering * element_weights).astype(self.complex_dtype)
+
+    def compute_uv_pattern(self, grid_size=512, azimuth=None, elevation=None):
+        # Far-field pattern over the direction cosines u (along y) and v
+        # (along z), as (len(v), len(u)) in dB re. its peak with a -60 dB
+        # floor, NaN outside the visible region u**2 + v**2 <= 1. For
+        # separable arrays the array factor factorizes as
+        # Ez.T @ W.T @ Ey, with Ey (columns x u) and Ez (rows x v), two small
+        # matrix products instead of an exponential per element and direction.
+        nv, nu = (grid_size, grid_size) if np.isscalar(grid_size) else grid_size
+        u = np.linspace(-1, 1, nu, dtype=self.real_dtype)
+        v = np.linspace(-1, 1, nv, dtype=self.real_dtype)
+        k = self.real_dtype(2 * np.pi / self.wavelength)
+
+        if self.array_type == 'curved':
+            # Not separable, sum the elements of the arc in the x-y plane
+            x_positions, y_positions = self.get_field_element_positions()
+            phase_shifts = self.get_field_phase_shifts(x_positions, y_positions, azimuth)
+            w = np.sqrt(np.maximum(1 - u[None, :] ** 2 - v[:, None] ** 2, 0))
+            field = np.zeros((nv, nu), dtype=self.complex_dtype)
+            for x_pos, y_pos, phase_shift, weight in zip(x_positions, y_positions, phase_shifts,
+                                                         self.get_element_weights()):
+                field += weight * np.exp(1j * (phase_shift - k * (x_pos * w + y_pos * u[None, :])))
+        else:
+            y_positions, z_positions = self.get_planar_axes()
+            weights = self.get_planar_weights(azimuth, elevation)
+            steering_y = np.exp(-1j * k * np.outer(y_positions, u))
+            steering_z = np.exp(-1j * k * np.outer(z_positions, v))
+            field = (steering_z.T @ weights.T) @ steering_y
+
+        magnitude = np.abs(field)
+        invisible = u[None, :] ** 2 + v[:, None] ** 2 > 1
+        magnitude[invisible] = 0
+        magnitude /= magnitude.max() or 1
+        pattern = 20 * np.log10(np.maximum(magnitude, 1e-3))
+        pattern[invisible] = np.nan
+        return {'u': u, 'v': v, 'pattern': pattern}
+
+    def fresnel_phase_error(self, x, y, z):
+        # Largest phase error, in radians, of the paraxial Fresnel
+        # approximation over the grid: k * rho**4 / (8 * x**3), with rho the
+        # largest lateral distance between an element and a point
+        x_min = np.min(x)
+        if x_min <= 0:
+            return np.inf
+        y_positions, z_positions = self.get_planar_axes()
+        rho_y = max(np.max(y) - y_positions.min(), y_positions.max() - np.min(y))
+        rho_z = max(np.max(z) - z_positions.min(), z_positions.max() - np.min(z))
+        k = 2 * np.pi / self.wavelength
+        return float(k * (rho_y ** 2 + rho_z ** 2) ** 2 / (8 * x_min ** 3))
+
+    def compute_volume(self, x, y, z, method='auto', dtype=None, azimuth=None, elevation=None):
+        # Normalized intensity over the grid spanned by the axial x, lateral
+        # y and elevation z axes, shaped (len(x), len(y), len(z)), on the
+        # interference map's log scale.
+        #
+        # 'fresnel' uses r ~ x + ((y - y_m)**2 + (z - z_n)**2) / (2 * x), which
+        # separates into (y, column) and (z, row) factors Fy and Fz, so every
+        # x plane is the product Fy @ W @ Fz.T. 'exact' sums the exact
+        # distance of every element in chunks within memory_budget. 'auto'
+        # uses fresnel for separable arrays when fresnel_phase_error is
+        # within fresnel_tolerance.
+        dtype = self.complex_dtype if dtype is None else dtype
+        real_dtype = np.finfo(dtype).dtype
+        x, y, z = (np.atleast_1d(np.asarray(axis, dtype=real_dtype)) for axis in (x, y, z))
+
+        intensity = np.empty((len(x), len(y), len(z)), dtype=real_dtype)
+        method = self._volume_intensity(x, y, z, method, dtype, intensity, azimuth, elevation)
+
+        # Same log scaling as the interference map, over the whole volume
+        intensity /= intensity.max() or 1
+        intensity += 1
+        np.log10(intensity, out=intensity)
+        intensity /= intensity.max() or 1
+        return {'x': x, 'y': y, 'z': z, 'intensity': intensity, 'method': method}
+
+    def _volume_intensity(self, x, y, z, method, dtype, out, azimuth=None, elevation=None):
+        # |field|**2 over the x, y, z grid into out, returns the method used
+        if method == 'auto':
+            separable = self.array_type != 'curved'
+            method = 'fresnel' if separable and self.fresnel_phase_error(x, y, z) <= self.fresnel_tolerance else 'exact'
+            num_elements = self.num_elements * (self.num_rows if self.array_type == 'planar' else 1)
+            if method == 'exact' and num_elements * out.size > self.exact_volume_limit:
+                raise ValueError("The Fresnel approximation is not accurate over this volume and the exact "
+                                 "method exceeds exact_volume_limit; move the volume further from the array "
+                                 "or pass method='fresnel' or 'exact' explicitly")
+        k = 2 * np.pi / self.wavelength
+
+        if method == 'fresnel':
+            y_positions, z_positions = self.get_planar_axes()
+            weights = self.get_planar_weights(azimuth, elevation).astype(dtype)
+            distance_y = (y[:, None] - y_positions[None, :]) ** 2
+            distance_z = (z[:, None] - z_positions[None, :]) ** 2
+
+            def fresnel_planes(band):
+                # The common exp(1j * k * x) factor of a plane drops out of
+                # its intensity
+                for plane, x_plane in zip(out[band], x[band]):
+                    scale = k / (2 * x_plane)
+                    fresnel_y = np.exp(1j * scale * distance_y).astype(dtype, copy=False)
+                    fresnel_z = np.exp(1j * scale * distance_z).astype(dtype, copy=False)
+                    np.abs((fresnel_y @ weights) @ fresnel_z.T, out=plane)
+                    plane **= 2
+
+            self._run_parallel(fresnel_planes, self._bands(len(x)))
+        elif method == 'exact':
+            self._exact_volume_intensity(x, y, z, dtype, out, azimuth, elevation)
+        else:
+            raise ValueError(f"Unknown volume method '{method}', expected 'auto', 'fresnel' or 'exact'")
+        return method
+
+    def _exact_volume_intensity(self, x, y, z, dtype, out, azimuth=None, elevation=None):
+        # Element positions in 3-D and their complex weights
+        if self.array_type == 'curved':
+            x_positions, y_positions = self.get_field_element_positions()
+            z_positions = np.zeros_like(x_positions)
+            weights = np.exp(1j * self.get_field_phase_shifts(x_positions, y_positions, azimuth)) \
+                * self.get_element_weights()
+        else:
+            lateral, elevation_positions = self.get_planar_axes()
+            y_positions, z_positions = (axis.ravel() for axis in np.meshgrid(lateral, elevation_positions, indexing='ij'))
+            x_positions = np.zeros_like(y_positions)
+            weights = self.get_planar_weights(azimuth, elevation).ravel()
+        amplitudes, phases = np.abs(weights), np.angle(weights)
+        k = 2 * np.pi / self.wavelength
+        real_dtype = out.dtype
+
+        # Scratch per x plane: the complex accumulator and two real buffers
+        plane_bytes = 4 * len(y) * len(z) * np.dtype(real_dtype).itemsize
+        bands = self._bands(len(x))
+        planes_per_tile = max(1, int(self.memory_budget / len(bands) // plane_bytes))
+
+        def exact_planes(band):
+            x_band = x[band]
+            for start in range(0, len(x_band), planes_per_tile):
+                x_tile = x_band[start:start + planes_per_tile]
+                field = np.zeros((len(x_tile), len(y), len(z)), dtype=dtype)
+                arg = np.empty(field.shape, dtype=real_dtype)
+                trig = np.empty_like(arg)
+                for element in np.flatnonzero(amplitudes):
+                    # Distance from this element to every point of the tile
+                    np.add(((x_tile - x_positions[element]) ** 2)[:, None, None],
+                           ((y - y_positions[element]) ** 2)[None, :, None], out=arg)
+                    arg += ((z - z_positions[element]) ** 2)[None, None, :]
+                    np.sqrt(arg, out=arg)
+                    arg *= k
+                    arg += phases[element]
+                    np.cos(arg, out=trig)
+                    trig *= amplitudes[element]
+                    field.real += trig
+                    np.sin(arg, out=trig)
+                    trig *= amplitudes[element]
+                    field.imag += trig
+                tile_out = out[band][start:start + len(x_tile)]
+                np.abs(field, out=tile_out)
+                tile_out **= 2
+
+        self._run_parallel(exact_planes, bands)
+
+    def _planar_slice_intensity(self, x, y, dtype, beam_angle, out):
+        # |field|**2 of a planar array in the horizontal plane through its
+        # centre (z = 0), as a (len(y), len(x)) map
+        real_dtype = np.finfo(dtype).dtype
+        volume = np.empty((len(x), len(y), 1), dtype=real_dtype)
+        self._volume_intensity(x.astype(real_dtype), y.astype(real_dtype), np.zeros(1, dtype=real_dtype),
+                               'auto', dtype, volume, beam_angle)
+        out[...] = volume[:, :, 0].T
+        return out
+
+    def _project_basis(self, weights, basis, out):
+        # out = |weights @ basis|**2, in bands of angles so the complex
+        # intermediate stays within memory_budget
+        band_bytes = basis.shape[1] * np.dtype(basis.dtype).itemsize
+        angles_per_band = max(1, int(self.memory_budget // band_bytes))
+        for start in range(0, len(weights), angles_per_band):
+            field = weights[start:start + angles_per_band] @ basis
+            np.abs(field, out=out[start:start + angles_per_band])
+        out **= 2
+
+    def _normalize_intensity(self, intensity):
+        # Normalize every map of a (... x H x W) intensity array in place
+        peak_axes = (-2, -1)
+        # Normalize the intensity, a silent array stays an all-zero map
+        peak = np.max(intensity, axis=peak_axes, keepdims=True)
+        intensity /= np.where(peak > 0, peak, 1)
+        # Log scale normalization to better show the pattern
+        intensity += 1  # Add 1 to avoid log(0)
+        np.log10(intensity, out=intensity)
+        peak = np.max(intensity, axis=peak_axes, keepdims=True)
+        intensity /= np.where(peak > 0, peak, 1)
+        return intensity
+
+    def _cached_basis(self, name, key, build, slots=1, nbytes=0):
+        # Up to `slots` bases per name, least recently used first
+        cached = self._bases.setdefault(name, [])
+        for index, (cached_key, basis) in enumerate(cached):
+            if cached_key == key:
+                cached.append(cached.pop(index))
+                return basis
+        # Release stale bases before building the replacement, while there
+        # is no free slot or the kept ones and its nbytes exceed basis_budget.
+        # Field bases share the budget with the kept map fields, which go
+        # last as they are much smaller.
+        fields = self._last_fields if name == 'field' else {}
+        while cached and (len(cached) >= slots or sum(basis.nbytes for _, basis in cached)
+                          + sum(field.nbytes for _, field in fields.values()) + nbytes > self.basis_budget):
+            del cached[0]
+        while fields and sum(field.nbytes for _, field in fields.values()) + nbytes > self.basis_budget:
+            del fields[next(iter(fields))]
+        self.instrumentation.count(f'basis_builds.{name}')
+        basis = build()
+        cached.append((key, basis))
+        return basis
+
+    def get_field_basis(self, x, y, x_positions, y_positions, k, dtype):
+        # Elements x pixels matrix of exp(1j * k * distance). It depends only
+        # on the geometry, frequency and grid, not on the beam angle. Returns
+        # None when it would not fit in basis_budget.
+        num_pixels = len(x) * len(y)
+        nbytes = len(x_positions) * num_pixels * np.dtype(dtype).itemsize
+        if nbytes > self.basis_budget:
+            return None
+
+        # One basis per grid, so the preview and the refined map of the same
+        # geometry do not evict each other
+        key = (x.tobytes(), y.tobytes(), x_positions.tobytes(), y_positions.tobytes(), k, np.dtype(dtype).name)
+        return self._cached_basis('field', key, lambda: self._build_field_basis(x, y, x_positions, y_positions, k, dtype),
+                                  slots=self.field_basis_slots, nbytes=nbytes)
+
+    def worker_count(self):
+        return self.num_workers or os.cpu_count() or 1
+
+    def _bands(self, length):
+        # Contiguous slices of range(length), one per worker
+        workers = max(1, min(self.worker_count(), length))
+        bounds = np.linspace(0, length, workers + 1).astype(int)
+        return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def _run_parallel(self, func, bands):
+        # Run func on every band, on the thread pool when there is more than
+        # one. NumPy releases the GIL inside its array kernels, and every
+        # band writes to its own slice of a shared output, so the threads
+        # need no locking and nothing is copied.
+        if len(bands) == 1:
+            func(bands[0])
+            return
+        # One pool of worker_count() threads serves any number of bands, it
+        # is only replaced when num_workers changes
+        workers = self.worker_count()
+        if self._executor is None or self._executor_workers != workers:
+            # Only imported once a map is actually split
+            from concurrent.futures import ThreadPoolExecutor
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix='field')
+            self._executor_workers = workers
+        for future in [self._executor.submit(func, band) for band in bands]:
+            future.result()
+
+    def _build_field_basis(self, x, y, x_positions, y_positions, k, dtype):
+        real_dtype = np.finfo(dtype).dtype
+        x = x.astype(real_dtype, copy=False)
+        y = y.astype(real_dtype, copy=False)
+        basis = np.empty((len(x_positions), len(y) * len(x)), dtype=dtype)
+
+        def build_rows(elements):
+            # Every worker fills the basis rows of its own band of elements
+            arg = np.empty((len(y), len(x)), dtype=real_dtype)
+            for row, x_pos, y_pos in zip(basis[elements], x_positions[elements], y_positions[elements]):
+                # Propagation phase from this element to every point of the grid
+                np.add(((y - y_pos) ** 2)[:, None], ((x - x_pos) ** 2)[None, :], out=arg)
+                np.sqrt(arg, out=arg)
+                arg *= k
+                np.cos(arg, out=row.real.reshape(arg.shape))
+                np.sin(arg, out=row.imag.reshape(arg.shape))
+
+        self._run_parallel(build_rows, self._bands(len(x_positions)))
+        return basis
+
+    def _rows_per_tile(self, width, real_dtype, budget=None):
+        # Two real scratch buffers of one tile each must fit in the budget
+        row_bytes = 2 * width * np.dtype(real_dtype).itemsize
+        return max(1, int((self.memory_budget if budget is None else budget) // row_bytes))
+
+    def _accumulate_field(self, x, y, x_positions, y_positions, weights, k, dtype, out=None):
+        # Stream the contribution of every element, scaled by its complex
+        # weight, into a single preallocated accumulator, so the scratch
+        # memory is bounded by memory_budget whatever the grid size or
+        # element count. The rows are split into one band per worker,
+        # evaluated concurrently.
+        real_dtype = np.finfo(dtype).dtype
+        x = x.astype(real_dtype, copy=False)
+        y = y.astype(real_dtype, copy=False)
+
+        field = np.empty((len(y), len(x)), dtype=dtype) if out is None else out
+        kernels = self.get_kernels()
+        if kernels is not None:
+            # One fused pass per pixel, parallelized by numba over rows
+            kernels.accumulate_field(x, y, x_positions, y_positions, np.asarray(weights, dtype=dtype), float(k), field)
+            return field
+
+        # Failed elements contribute nothing and are skipped. A weight is
+        # applied as a phase offset, plus an amplitude unless all are unit.
+        active = np.flatnonzero(weights)
+        phase_shifts = np.angle(weights[active]).astype(real_dtype)
+        amplitudes = np.abs(weights[active]).astype(real_dtype)
+        if np.allclose(amplitudes, 1, rtol=0, atol=4 * np.finfo(real_dtype).eps):
+            amplitudes = None
+
+        field.fill(0)
+        bands = self._bands(len(y))
+        budget = self.memory_budget / len(bands)
+        self._run_parallel(
+            lambda band: self._accumulate_rows(field[band], x, y[band], x_positions[active], y_positions[active],
+                                               phase_shifts, k, budget, amplitudes),
+            bands)
+        return field
+
+    def _accumulate_rows(self, field, x, y, x_positions, y_positions, phase_shifts, k, budget, amplitudes=None):
+        # Accumulate a band of rows one tile at a time within budget
+        rows_per_tile = self._rows_per_tile(len(x), y.dtype, budget)
+        arg_buffer = np.empty((min(rows_per_tile, len(y)), len(x)), dtype=y.dtype)
+        trig_buffer = np.empty_like(arg_buffer)
+
+        for row_start in range(0, len(y), rows_per_tile):
+            y_tile = y[row_start:row_start + rows_per_tile]
+            field_tile = field[row_start:row_start + len(y_tile)]
+            arg = arg_buffer[:len(y_tile)]
+            trig = trig_buffer[:len(y_tile)]
+
+            for element, (x_pos, y_pos, phase_shift) in enumerate(zip(x_positions, y_positions, phase_shifts)):
+                # Distance from this element to every point of the tile
+                np.add(((y_tile - y_pos) ** 2)[:, None], ((x - x_pos) ** 2)[None, :], out=arg)
+                np.sqrt(arg, out=arg)
+
+                # Phase of this element's wave, including its steering shift
+                arg *= k
+                arg += phase_shift
+
+                # Add contribution from this element
+                np.cos(arg, out=trig)
+                if amplitudes is not None:
+                    trig *= amplitudes[element]
+                field_tile.real += trig
+                np.sin(arg, out=trig)
+                if amplitudes is not None:
+                    trig *= amplitudes[element]
+                field_tile.imag += trig
+
+    def _last_fields_nbytes(self):
+        return sum(field.nbytes for _, field in self._last_fields.values())
+
+    def _keep_last_field(self, grid_key, weights, field):
+        # Keep the field of a map for _update_last_field, oldest grids first
+        # out, within field_basis_slots and what the field bases leave of
+        # basis_budget. Nothing is kept when basis_budget is 0.
+        self._last_fields.pop(grid_key, None)
+        bases_nbytes = sum(basis.nbytes for _, basis in self._bases.get('field', ()))
+        while self._last_fields and (len(self._last_fields) >= self.field_basis_slots
+                                     or bases_nbytes + self._last_fields_nbytes() + field.nbytes > self.basis_budget):
+            del self._last_fields[next(iter(self._last_fields))]
+        if self.field_basis_slots > 0 and bases_nbytes + field.nbytes <= self.basis_budget:
+            self._last_fields[grid_key] = (weights, field)
+
+    def _update_last_field(self, grid_key, weights, x, y, x_positions, y_positions, k, basis):
+        # Field of the last map on this grid brought up to date in place,
+        # when at most incremental_limit element weights changed since:
+        # field += (new - old) * contribution of each changed element, which
+        # costs O(pixels) per element instead of re-summing all of them.
+        # Returns None when there is no such map to start from.
+        last = self._last_fields.get(grid_key)
+        if last is None:
+            return None
+        old_weights, field = last
+        if not np.any(weights):
+            # Every element failed, no rounding residue left behind
+            field.fill(0)
+            return field
+        changed = np.flatnonzero(weights != old_weights)
+        if len(changed) > min(self.incremental_limit, len(weights) // 2):
+            return None
+        self.instrumentation.count('interference_map.incremental_elements', len(changed))
+
+        real_dtype = np.finfo(field.dtype).dtype
+        x = x.astype(real_dtype, copy=False)
+        y = y.astype(real_dtype, copy=False)
+        rows_per_tile = self._rows_per_tile(len(x), real_dtype)
+        arg_buffer = np.empty((min(rows_per_tile, len(y)), len(x)), dtype=real_dtype)
+        trig_buffer = np.empty_like(arg_buffer)
+        for element in changed:
+            delta = weights[element] - old_weights[element]
+            if basis is not None:
+                field += delta * basis[element].reshape(field.shape)
+                continue
+            for row_start in range(0, len(y), rows_per_tile):
+                y_tile = y[row_start:row_start + rows_per_tile]
+                field_tile = field[row_start:row_start + len(y_tile)]
+                arg = arg_buffer[:len(y_tile)]
+                trig = trig_buffer[:len(y_tile)]
+                np.add(((y_tile - y_positions[element]) ** 2)[:, None], ((x - x_positions[element]) ** 2)[None, :],
+                       out=arg)
+                np.sqrt(arg, out=arg)
+                arg *= k
+                # delta * (cos + 1j * sin), one real part at a time
+                np.cos(arg, out=trig)
+                field_tile.real += delta.real * trig
+                field_tile.imag += delta.imag * trig
+                np.sin(arg, out=trig)
+                field_tile.real -= delta.imag * trig
+                field_tile.imag += delta.real * trig
+        return field
@@ -0,0 +1,927 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from beam_simulator import BeamformingSimulator
+from scenario_manager import ScenarioCatalog
+from simulation_cache import CachedSimulator
+
+
+def make_simulator(num_elements, array_type='linear'):
+    simulator = BeamformingSimulator()
+    simulator.num_elements = num_elements
+    simulator.array_type = array_type
+    simulator.curvature_radius = (num_elements - 1) * 0.5 / np.pi
+    simulator.set_beam_angle(20)
+    return simulator
+
+
+def scenario_simulators(scenarios_dir='scenarios'):
+    # One configured simulator per bundled scenario file
+    for filepath in sorted(glob.glob(f'{scenarios_dir}/*.json')):
+        with open(filepath, 'r') as f:
+            scenario = json.load(f)
+        simulator = BeamformingSimulator()
+        simulator.apply_scenario(scenario)
+        simulator.set_beam_angle(scenario['beam_angle_range'][1] / 2)
+        yield scenario['name'], simulator
+
+
+def time_call(func, repeat=3):
+    # Best of `repeat` runs, in seconds
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def reference_beam_profile(simulator):
+    # Original scalar implementation, kept as the accuracy and speed reference
+    theta = np.linspace(-np.pi, np.pi, 1000)
+    x_positions, y_positions = simulator.get_element_positions()
+    steering_angle = np.deg2rad(simulator.beam_angle)
+    results = np.zeros_like(theta)
+
+    for angle_idx, view_angle in enumerate(theta):
+        total_field = 0
+        for x_pos, y_pos in zip(x_positions, y_positions):
+            if simulator.array_type == 'linear':
+                path_diff = x_pos * (np.sin(view_angle) - np.sin(steering_angle))
+            else:
+                dx = x_pos
+                dy = y_pos - simulator.curvature_radius
+                path_diff = (dx * np.sin(view_angle) + dy * np.cos(view_angle) -
+                             (dx * np.sin(steering_angle) + dy * np.cos(steering_angle)))
+            phase = 2 * np.pi * path_diff / simulator.wavelength
+            total_field += np.exp(1j * phase)
+        results[angle_idx] = np.abs(total_field)
+
+    results = 20 * np.log10(results / np.max(results))
+    results = np.maximum(results, -60)
+    return {'x': np.rad2deg(theta), 'y': 1 + (results / 60)}
+
+
+def reference_interference_map(simulator):
+    # Original meshgrid implementation, kept as the accuracy reference
+    x = np.linspace(-20, 20, 400)
+    y = np.linspace(-20, 20, 400)
+    X, Y = np.meshgrid(x, y)
+    k = 2 * np.pi / simulator.wavelength
+    x_positions, y_positions = simulator.get_field_element_positions()
+    steering_angle_rad = np.deg2rad(simulator.beam_angle)
+    field = np.zeros_like(X, dtype=complex)
+
+    for x_pos, y_pos in zip(x_positions, y_positions):
+        distances = np.sqrt((X - x_pos)**2 + (Y - y_pos)**2)
+        if simulator.array_type == 'linear':
+            phase_shift = k * y_pos * np.sin(steering_angle_rad)
+        else:
+            element_angle = np.arctan2(y_pos, x_pos)
+            phase_shift = k * simulator.curvature_radius * np.cos(element_angle - steering_angle_rad)
+        field += np.exp(1j * (k * distances + phase_shift))
+
+    intensity = np.abs(field)**2
+    intensity = intensity / np.max(intensity)
+    intensity = np.log10(intensity + 1)
+    intensity = intensity / np.max(intensity)
+    return {'X': X, 'Y': Y, 'interference': intensity}
+
+
+def reset_peak_rss():
+    # The RSS high-water mark survives fork/exec, reset it where Linux allows
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def current_rss_mib():
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def peak_rss_mib():
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def _interference_map_child(num_elements, array_type, grid_size, dtype, basis_budget, queue):
+    # Runs in a fresh process so that the peak memory belongs to this map only
+    simulator = make_simulator(num_elements, array_type)
+    simulator.basis_budget = basis_budget
+    reset_peak_rss()
+    tracemalloc.start()
+    elapsed, _ = time_call(lambda: simulator.compute_interference_map(grid_size=grid_size, dtype=dtype), repeat=1)
+    traced_peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    queue.put((elapsed, traced_peak, peak_rss_mib()))
+
+
+def measure_in_child(target, *args):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=target, args=args + (queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def bench_beam_profile(args):
+    print(f"{'array':<8}{'elements':>10}{'reference [ms]':>16}{'vectorized [ms]':>17}{'speedup':>10}{'max err':>11}")
+    for array_type in args.array_types:
+        for num_elements in args.elements:
+            simulator = make_simulator(num_elements, array_type)
+            ref_time, expected = time_call(lambda: reference_beam_profile(simulator), repeat=1)
+            new_time, actual = time_call(simulator.compute_beam_profile, repeat=args.repeat)
+            error = np.max(np.abs(actual['y'] - expected['y']))
+            np.testing.assert_allclose(actual['y'], expected['y'], rtol=0, atol=1e-9)
+            print(f"{array_type:<8}{num_elements:>10}{ref_time * 1e3:>16.1f}{new_time * 1e3:>17.2f}"
+                  f"{ref_time / new_time:>9.0f}x{error:>11.1e}")
+
+
+def bench_interference_map(args):
+    # Accuracy against the original implementation at the default grid
+    for array_type in args.array_types:
+        simulator = make_simulator(64, array_type)
+        expected = reference_interference_map(simulator)['interference']
+        actual = simulator.compute_interference_map()['interference']
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+        print(f"{array_type}: max abs error vs reference {np.max(np.abs(actual - expected)):.1e}")
+
+    # The cached field basis trades memory for re-steering speed, it is
+    # disabled unless requested so the streaming evaluator is measured
+    basis_budget = args.basis_budget_mib * 2**20
+    print(f"{'grid':>6}{'elements':>10}{'dtype':>12}{'time [s]':>10}{'peak alloc [MiB]':>18}{'peak RSS [MiB]':>16}")
+    for grid_size in args.grids:
+        for num_elements in args.elements:
+            for dtype in args.dtypes:
+                elapsed, traced_peak, peak = measure_in_child(
+                    _interference_map_child, num_elements, 'linear', grid_size, dtype, basis_budget)
+                print(f"{grid_size:>6}{num_elements:>10}{dtype:>12}{elapsed:>10.2f}{traced_peak:>18.1f}{peak:>16.1f}")
+
+
+def profile_error_db(actual, expected, floor_db=-40):
+    # Compare beam profiles on their dB scale, ignoring the region below floor_db
+    actual_db = 60 * (actual['y'].astype(np.float64) - 1)
+    expected_db = 60 * (expected['y'] - 1)
+    visible = expected_db > floor_db
+    return np.max(np.abs(actual_db - expected_db)[visible])
+
+
+def map_error_floor_db(actual, expected):
+    # Undo the log display scaling and report the largest intensity error
+    # relative to the peak, in dB
+    actual_intensity = 2 ** actual['interference'].astype(np.float64) - 1
+    expected_intensity = 2 ** expected['interference'] - 1
+    error = np.max(np.abs(actual_intensity - expected_intensity))
+    return 10 * np.log10(max(error, 1e-30))
+
+
+def bench_precision(args):
+    print(f"{'scenario':<22}{'profile dB err':>16}{'map err floor [dB]':>20}"
+          f"{'profile speedup':>17}{'map speedup':>13}")
+    for name, simulator in scenario_simulators():
+        simulator.set_precision('double')
+        double_profile_time, double_profile = time_call(simulator.compute_beam_profile)
+        double_map_time, double_map = time_call(simulator.compute_interference_map, repeat=1)
+
+        simulator.set_precision('single')
+        single_profile_time, single_profile = time_call(simulator.compute_beam_profile)
+        single_map_time, single_map = time_call(simulator.compute_interference_map, repeat=1)
+
+        print(f"{name:<22}{profile_error_db(single_profile, double_profile):>16.2e}"
+              f"{map_error_floor_db(single_map, double_map):>20.1f}"
+              f"{double_profile_time / single_profile_time:>16.1f}x"
+              f"{double_map_time / single_map_time:>12.1f}x")
+
+
+def bench_cache(args):
+    # Drag the beam angle across the slider range and back again
+    simulator = make_simulator(args.num_elements)
+    cached_simulator = CachedSimulator(simulator, max_bytes=args.max_mib * 2**20)
+    angles = list(range(-90, 91)) + list(range(90, -91, -1))
+
+    for sweep in range(args.sweeps):
+        start = time.perf_counter()
+        for angle in angles:
+            simulator.set_beam_angle(angle)
+            cached_simulator.compute_beam_profile()
+            cached_simulator.compute_interference_map()
+        elapsed = time.perf_counter() - start
+        stats = cached_simulator.stats()
+        print(f"sweep {sweep + 1}: {elapsed * 1e3 / len(angles):8.2f} ms/frame, "
+              f"hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries, "
+              f"{stats['bytes'] / 2**20:.1f} MiB cached, {stats['evictions']} evictions")
+
+
+def bench_steering(args):
+    # Slider drag at a fixed geometry: streaming evaluation against the
+    # cached field basis, where each frame is one weights x basis product
+    angles = range(-90, 91, 10)
+    print(f"{'elements':>10}{'dtype':>12}{'streaming [ms]':>16}{'basis build [ms]':>18}"
+          f"{'basis frame [ms]':>18}{'fps':>8}{'basis [MiB]':>13}")
+    for num_elements in args.elements:
+        for precision in args.precisions:
+            simulator = make_simulator(num_elements)
+            simulator.set_precision(precision)
+
+            simulator.basis_budget = 0
+            streaming_time, _ = time_call(simulator.compute_interference_map, repeat=1)
+
+            simulator.basis_budget = args.basis_budget_mib * 2**20
+            build_time, _ = time_call(simulator.compute_interference_map, repeat=1)
+            start = time.perf_counter()
+            for angle in angles:
+                simulator.set_beam_angle(angle)
+                simulator.compute_interference_map()
+            frame_time = (time.perf_counter() - start) / len(angles)
+            basis_mib = sum(basis.nbytes for _, basis in simulator._bases.get('field', ())) / 2**20
+            print(f"{num_elements:>10}{np.dtype(simulator.complex_dtype).name:>12}{streaming_time * 1e3:>16.1f}"
+                  f"{build_time * 1e3:>18.1f}{frame_time * 1e3:>18.1f}{1 / frame_time:>8.1f}{basis_mib:>13.1f}")
+
+    # The same drag on the grid the app asks for at display size: the
+    # refined grid must keep its basis within the budget, or every frame
+    # falls back to streaming
+    width, height = args.display_size
+    x_range, y_range = (-20, 20), (-20, 20)
+    print(f"\ndisplay {width}x{height}")
+    print(f"{'elements':>10}{'dtype':>12}{'grid':>12}{'frame [ms]':>12}{'fps':>8}{'basis [MiB]':>13}")
+    for num_elements in args.elements:
+        for precision in args.precisions:
+            simulator = make_simulator(num_elements)
+            simulator.set_precision(precision)
+            simulator.basis_budget = args.basis_budget_mib * 2**20
+            grid_size = simulator.adaptive_grid_size(x_range, y_range, (width, height),
+                                                     basis_fraction=1 - args.preview_basis_fraction)
+            simulator.compute_interference_map(grid_size, x_range=x_range, y_range=y_range)
+            start = time.perf_counter()
+            for angle in angles:
+                simulator.set_beam_angle(angle)
+                simulator.compute_interference_map(grid_size, x_range=x_range, y_range=y_range)
+            frame_time = (time.perf_counter() - start) / len(angles)
+            basis_mib = sum(basis.nbytes for _, basis in simulator._bases.get('field', ())) / 2**20
+            grid = f'{grid_size[0]}x{grid_size[1]}'
+            print(f"{num_elements:>10}{np.dtype(simulator.complex_dtype).name:>12}{grid:>12}"
+                  f"{frame_time * 1e3:>12.1f}{1 / frame_time:>8.1f}{basis_mib:>13.1f}")
+
+
+def make_offscreen_app():
+    # The Qt benchmarks run without a display
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from main import BeamformingApp
+
+    app = QApplication.instance() or QApplication([])
+    window = BeamformingApp()
+    window.show()
+    app.processEvents()
+    return app, window
+
+
+def bench_soak(args):
+    # Push thousands of frames through the persistent plot items and check
+    # that memory, repaint time and scene size stay flat
+    app, window = make_offscreen_app()
+    simulator = make_simulator(args.num_elements)
+    maps, profiles = [], []
+    for angle in np.linspace(-60, 60, 12):
+        simulator.set_beam_angle(angle)
+        maps.append(simulator.compute_interference_map()['interference'])
+        profiles.append(simulator.compute_beam_profile())
+    views = [window.interference_view, window.beam_profile_view, window.array_view]
+
+    print(f"{'updates':>8}{'RSS [MiB]':>11}{'repaint p50 [ms]':>18}{'repaint max [ms]':>18}{'scene items':>13}")
+    repaint_times = []
+    for update in range(1, args.updates + 1):
+        window.num_elements_spin.blockSignals(True)
+        window.num_elements_spin.setValue(8 + update % 8)
+        window.num_elements_spin.blockSignals(False)
+        window.update_array_visualization()
+        window.plot_beam_profile(profiles[update % len(profiles)])
+        window.show_interference_map(maps[update % len(maps)])
+        start = time.perf_counter()
+        for view in views:
+            view.repaint()
+        app.processEvents()
+        repaint_times.append(time.perf_counter() - start)
+
+        if update % args.block == 0:
+            items = sum(len(view.getPlotItem().items) for view in views)
+            print(f"{update:>8}{current_rss_mib():>11.1f}{np.median(repaint_times) * 1e3:>18.2f}"
+                  f"{np.max(repaint_times) * 1e3:>18.2f}{items:>13}")
+            repaint_times = []
+    window.close()
+
+
+def bench_scan(args):
+    # Sector scan table: one call per steering angle against a single
+    # batched call sharing the geometry work
+    angles = np.linspace(-45, 45, args.lines)
+    print(f"{'array':<8}{'elements':>10}{'output':>12}{'per-angle [s]':>15}{'batched [s]':>13}{'speedup':>9}")
+    for array_type in args.array_types:
+        for num_elements in args.elements:
+            simulator = make_simulator(num_elements, array_type)
+
+            def per_angle():
+                for angle in angles:
+                    simulator.set_beam_angle(angle)
+                    simulator.compute_beam_profile()
+                    simulator.compute_interference_map()
+
+            def batched():
+                simulator.compute_beam_profiles(angles)
+                simulator.compute_interference_maps(angles)
+
+            # Build the cached bases first so both sides measure steering only
+            simulator.compute_interference_map()
+            loop_time, _ = time_call(per_angle, repeat=1)
+            batch_time, _ = time_call(batched, repeat=1)
+            print(f"{array_type:<8}{num_elements:>10}{args.lines:>12}{loop_time:>15.2f}{batch_time:>13.2f}"
+                  f"{loop_time / batch_time:>8.1f}x")
+
+
+def bench_fft(args):
+    # FFT array factor against direct summation for uniform linear arrays.
+    # Direct summation is timed on a fresh simulator so the manifold build
+    # is included, as it is whenever the geometry or angular grid change.
+    print(f"{'elements':>10}{'angles':>9}{'direct [ms]':>13}{'steer [ms]':>12}{'fft [ms]':>10}"
+          f"{'speedup':>9}{'max dB err':>12}")
+    for num_elements in args.elements:
+        for resolution in args.resolutions:
+            simulator = make_simulator(num_elements)
+            simulator.profile_resolution = resolution
+            simulator.beam_profile_engine = 'fft'
+            fft_time, actual = time_call(simulator.compute_beam_profile, repeat=args.repeat)
+
+            manifold_bytes = num_elements * resolution * 16
+            if manifold_bytes > args.max_manifold_mib * 2**20:
+                print(f"{num_elements:>10}{resolution:>9}{'-':>13}{'-':>12}{fft_time * 1e3:>10.2f}{'-':>9}{'-':>12}")
+                continue
+            simulator.beam_profile_engine = 'direct'
+            direct_time, expected = time_call(simulator.compute_beam_profile, repeat=1)
+            steer_time, _ = time_call(simulator.compute_beam_profile, repeat=args.repeat)
+            error = np.max(np.abs(actual['y'] - expected['y'])) * 60
+            print(f"{num_elements:>10}{resolution:>9}{direct_time * 1e3:>13.2f}{steer_time * 1e3:>12.2f}"
+                  f"{fft_time * 1e3:>10.2f}{direct_time / fft_time:>8.1f}x{error:>12.1e}")
+
+
+def bench_parallel(args):
+    # Scaling of a single streaming interference map with the number of
+    # threads evaluating its row bands
+    workers = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"cores available: {os.cpu_count()}")
+    print(f"{'elements':>10}{'grid':>7}{'workers':>9}{'time [s]':>10}{'speedup':>9}{'efficiency':>12}")
+    for num_elements in args.elements:
+        for grid_size in args.grids:
+            simulator = make_simulator(num_elements)
+            simulator.basis_budget = 0
+            serial_time = None
+            for count in workers:
+                simulator.num_workers = count
+                elapsed, _ = time_call(lambda: simulator.compute_interference_map(grid_size), repeat=args.repeat)
+                serial_time = serial_time or elapsed
+                print(f"{num_elements:>10}{grid_size:>7}{count:>9}{elapsed:>10.2f}"
+                      f"{serial_time / elapsed:>8.2f}x{serial_time / elapsed / count:>12.0%}")
+
+
+def bench_jit(args):
+    # NumPy against the fused numba kernels, streaming map and direct profile.
+    # The first numba call includes compilation, or loading the on-disk cache.
+    from beam_simulator import load_numba_kernels
+    if load_numba_kernels() is None:
+        print("numba is not installed, only the NumPy backend is available")
+        return
+    print(f"{'elements':>10}{'grid':>7}{'numpy map [s]':>15}{'numba map [s]':>15}{'first call [s]':>16}"
+          f"{'numpy profile [ms]':>20}{'numba profile [ms]':>20}")
+    for num_elements in args.elements:
+        for grid_size in args.grids:
+            simulator = make_simulator(num_elements)
+            simulator.basis_budget = 0
+            simulator.beam_profile_engine = 'direct'
+            simulator.backend = 'numpy'
+            numpy_map, expected = time_call(lambda: simulator.compute_interference_map(grid_size), repeat=1)
+            numpy_profile, _ = time_call(simulator.compute_beam_profile, repeat=args.repeat)
+
+            simulator.backend = 'numba'
+            first_call, _ = time_call(lambda: simulator.compute_interference_map(grid_size), repeat=1)
+            numba_map, actual = time_call(lambda: simulator.compute_interference_map(grid_size), repeat=1)
+            numba_profile, _ = time_call(simulator.compute_beam_profile, repeat=args.repeat)
+            np.testing.assert_allclose(actual['interference'], expected['interference'], rtol=0, atol=1e-9)
+            print(f"{num_elements:>10}{grid_size:>7}{numpy_map:>15.2f}{numba_map:>15.2f}{first_call:>16.2f}"
+                  f"{numpy_profile * 1e3:>20.2f}{numba_profile * 1e3:>20.2f}")
+
+
+# Launches the app offscreen and prints the wall-clock times, in seconds
+# since the epoch, of the startup milestones as JSON
+FIRST_FRAME_SCRIPT = """
+import json, os, sys, time
+started = time.time()
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+import main
+imported = time.time()
+app = main.QApplication(sys.argv)
+window = main.BeamformingApp()
+constructed = time.time()
+window.show()
+shown = time.time()
+
+def first_frame(result):
+    app.processEvents()
+    print(json.dumps({'started': started, 'imported': imported, 'constructed': constructed,
+                      'shown': shown, 'first_frame': time.time()}))
+    window.close()
+    app.quit()
+
+window.worker.result_ready.connect(first_frame)
+app.exec_()
+"""
+
+
+def slowest_imports(module, count):
+    # Cumulative import times of `module` and its dependencies, slowest first
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def bench_startup(args):
+    # Time to first frame in fresh interpreters, measured from the moment
+    # the process is launched
+    runs = []
+    for _ in range(args.runs):
+        launched = time.time()
+        output = subprocess.run([sys.executable, '-c', FIRST_FRAME_SCRIPT], capture_output=True,
+                                text=True, check=True).stdout
+        milestones = json.loads(output.strip().splitlines()[-1])
+        runs.append({
+            'interpreter': milestones['started'] - launched,
+            'import main': milestones['imported'] - milestones['started'],
+            'construct window': milestones['constructed'] - milestones['imported'],
+            'show to first frame': milestones['first_frame'] - milestones['shown'],
+            'time to first frame': milestones['first_frame'] - launched,
+        })
+
+    print(f"{'phase':<24}{'median [ms]':>13}{'max [ms]':>10}")
+    for phase in runs[0]:
+        times = np.array([run[phase] for run in runs])
+        print(f"{phase:<24}{np.median(times) * 1e3:>13.0f}{times.max() * 1e3:>10.0f}")
+
+    print("\nslowest imports of main:")
+    for seconds, name in slowest_imports('main', args.top):
+        print(f"{seconds * 1e3:>8.1f} ms  {name}")
+
+    first_frame = np.median([run['time to first frame'] for run in runs]) * 1e3
+    if first_frame > args.target_ms:
+        print(f"\nTime to first frame {first_frame:.0f} ms exceeds the {args.target_ms:.0f} ms target")
+        sys.exit(1)
+    print(f"\nTime to first frame {first_frame:.0f} ms within the {args.target_ms:.0f} ms target")
+
+
+def bench_scenarios(args):
+    # Catalog scan, refresh and lookup against parsing a file on every load,
+    # over a directory of synthetic scenarios
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(args.count):
+            scenario = {'name': f'Site {index:05d}', 'num_elements': 16 + index % 240,
+                        'frequency': 1e6 * (1 + index % 50), 'array_type': ('Linear', 'Curved')[index % 2],
+                        'beam_angle_range': [-30, 30]}
+            with open(os.path.join(directory, f'site_{index:05d}.json'), 'w') as f:
+                json.dump(scenario, f)
+        names = [f'Site {index:05d}' for index in range(0, args.count, max(1, args.count // 100))]
+
+        scan_time, catalog = time_call(lambda: ScenarioCatalog(directory), repeat=1)
+        refresh_time, _ = time_call(catalog.refresh)
+        os.utime(os.path.join(directory, 'site_00000.json'), ns=(0, 0))
+        changed_time, _ = time_call(catalog.refresh, repeat=1)
+        lookup_time, _ = time_call(lambda: [catalog.get(name) for name in names])
+        query_time, matches = time_call(lambda: catalog.query(array_type='curved', max_frequency=10e6))
+
+        def parse_every_load():
+            for name in names:
+                filename = name.lower().replace(' ', '_') + '.json'
+                with open(os.path.join(directory, filename), 'r') as f:
+                    json.load(f)
+        parse_time, _ = time_call(parse_every_load)
+
+    print(f"{args.count} scenarios")
+    for label, value, unit in (('initial scan', scan_time * 1e3, 'ms'),
+                               ('refresh, nothing changed', refresh_time * 1e3, 'ms'),
+                               ('refresh, one file changed', changed_time * 1e3, 'ms'),
+                               ('load from catalog', lookup_time / len(names) * 1e6, 'us'),
+                               ('load parsing the file', parse_time / len(names) * 1e6, 'us'),
+                               (f'query, {len(matches)} matches', query_time * 1e3, 'ms')):
+        print(f"{label:<28}{value:>9.2f} {unit}")
+
+
+def make_planar_simulator(columns, rows, frequency=28e9):
+    simulator = BeamformingSimulator()
+    simulator.array_type = 'planar'
+    simulator.num_elements = columns
+    simulator.num_rows = rows
+    simulator.set_frequency(frequency)
+    simulator.set_beam_angle(20)
+    simulator.elevation_angle = 10
+    return simulator
+
+
+def traced_call(func):
+    # Wall time and traced peak allocation of one call
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def bench_planar(args):
+    # Separable (u, v) patterns and Fresnel volumes of planar arrays, with
+    # the Fresnel error checked against the exact sum on a coarse volume
+    print(f"{'array':>8}{'case':>22}{'method':>9}{'time [s]':>10}{'peak alloc [MiB]':>18}{'output [MiB]':>14}")
+    for size in args.sizes:
+        simulator = make_planar_simulator(size, size)
+        simulator.set_precision(args.precision)
+        aperture = size * simulator.element_spacing
+        # Axial range far enough for the Fresnel approximation over +-1 m
+        x = np.linspace(args.near, args.near * 3, args.volume)
+        lateral = np.linspace(-1, 1, args.volume)
+
+        cases = (
+            (f'uv {args.uv}x{args.uv}', lambda: simulator.compute_uv_pattern(args.uv), 'pattern'),
+            (f'volume {args.volume}^3', lambda: simulator.compute_volume(x, lateral, lateral, 'fresnel'), 'intensity'),
+        )
+        for name, func, key in cases:
+            elapsed, peak, result = traced_call(func)
+            print(f"{f'{size}x{size}':>8}{name:>22}{result.get('method', 'kron'):>9}{elapsed:>10.2f}"
+                  f"{peak / 2**20:>18.1f}{result[key].nbytes / 2**20:>14.1f}")
+
+        coarse = (x[::8], lateral[::8], lateral[::8])
+        fresnel = simulator.compute_volume(*coarse, method='fresnel')['intensity']
+        exact = simulator.compute_volume(*coarse, method='exact')['intensity']
+        error = np.max(np.abs((2 ** fresnel - 1) - (2 ** exact - 1)))
+        print(f"{'':>8}aperture {aperture:.3f} m, Fresnel phase error bound "
+              f"{simulator.fresnel_phase_error(x, lateral, lateral):.3f} rad, "
+              f"intensity error {10 * np.log10(max(error, 1e-30)):.1f} dB re. peak")
+
+
+def per_bin_energy_map(simulator, grid_size):
+    # Reference pulse energy map, one full narrowband map per frequency bin
+    x, y = simulator.get_grid_axes(grid_size)
+    x_positions, y_positions = simulator.get_field_element_positions()
+    k = 2 * np.pi / simulator.wavelength
+    phase_shifts = simulator.get_field_phase_shifts(x_positions, y_positions)
+    element_weights = simulator.get_element_weights()
+    frequencies, power = simulator.get_frequency_bins()
+    energy = np.zeros((len(y), len(x)))
+    for frequency, bin_power in zip(frequencies, power):
+        bin_k = 2 * np.pi * frequency / 3e8
+        shifts = phase_shifts * bin_k / k if simulator.steering_mode == 'delay' else phase_shifts
+        weights = np.exp(1j * shifts) * element_weights
+        field = simulator._accumulate_field(x, y, x_positions, y_positions, weights, bin_k, simulator.complex_dtype)
+        energy += bin_power * np.abs(field) ** 2
+    return simulator._normalize_intensity(energy)
+
+
+def bench_wideband(args):
+    # Cost of pulse energy maps and profiles against the number of frequency
+    # bins, and against evaluating every bin as a separate narrowband map
+    print(f"{'elements':>10}{'bins':>6}{'map [s]':>9}{'per bin [ms]':>14}{'vs 1 bin':>10}"
+          f"{'per-bin loop [s]':>18}{'speedup':>9}{'max err':>10}{'profile [ms]':>14}")
+    for num_elements in args.elements:
+        simulator = make_simulator(num_elements)
+        simulator.steering_mode = args.steering
+        single_time = None
+        for bins in args.bins:
+            simulator.num_frequencies = bins
+            elapsed, result = time_call(lambda: simulator.compute_pulse_energy_map(args.grid), repeat=args.repeat)
+            single_time = single_time or elapsed
+            profile_time, _ = time_call(simulator.compute_wideband_beam_profile, repeat=args.repeat)
+            if bins <= args.max_loop_bins:
+                loop_time, expected = time_call(lambda: per_bin_energy_map(simulator, args.grid), repeat=1)
+                error = np.max(np.abs(result['interference'] - expected))
+                loop = f"{loop_time:>18.2f}{loop_time / elapsed:>8.1f}x{error:>10.1e}"
+            else:
+                loop = f"{'-':>18}{'-':>9}{'-':>10}"
+            print(f"{num_elements:>10}{bins:>6}{elapsed:>9.2f}{elapsed / bins * 1e3:>14.1f}"
+                  f"{elapsed / single_time:>9.1f}x{loop}{profile_time * 1e3:>14.1f}")
+
+
+def bench_faults(args):
+    # Interactive fault injection: failing one element updates the field of
+    # the previous map in place, against re-summing every element
+    print(f"{'elements':>10}{'grid':>7}{'basis':>7}{'full [ms]':>11}{'toggle [ms]':>13}{'speedup':>9}{'max err':>10}")
+    for num_elements in args.elements:
+        for use_basis in (True, False):
+            simulator = make_simulator(num_elements)
+            simulator.taper = args.taper
+            if not use_basis:
+                simulator.basis_budget = 0
+            simulator.compute_interference_map(args.grid)
+            full_time, _ = time_call(lambda: (simulator._last_fields.clear(),
+                                              simulator.compute_interference_map(args.grid)), repeat=args.repeat)
+
+            def toggle():
+                failed = not simulator.failed_elements
+                simulator.set_element_failed(num_elements // 3, failed)
+                return simulator.compute_interference_map(args.grid)
+
+            toggle_time, result = time_call(toggle, repeat=args.repeat)
+            simulator._last_fields.clear()
+            expected = simulator.compute_interference_map(args.grid)
+            error = np.max(np.abs(result['interference'] - expected['interference']))
+            print(f"{num_elements:>10}{args.grid:>7}{'yes' if use_basis else 'no':>7}{full_time * 1e3:>11.1f}"
+                  f"{toggle_time * 1e3:>13.2f}{full_time / toggle_time:>8.0f}x{error:>10.1e}")
+
+
+def measure_case(func, repeat):
+    # Wall time over `repeat` runs, then one traced run for memory
+    func()  # warm-up, builds caches the case is not meant to measure
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # One traced call before the baseline snapshot, so that what the
+    # measured call frees (buffers, cache entries it replaces) was allocated
+    # under tracing and is subtracted, instead of only its new allocations
+    # showing up as retained
+    tracemalloc.start()
+    func()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    func()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    retained = after.compare_to(before, 'filename')
+
+    return {
+        'median_s': float(np.median(times)),
+        'min_s': float(np.min(times)),
+        'peak_bytes': int(peak),
+        'retained_bytes': int(sum(stat.size_diff for stat in retained)),
+        'retained_blocks': int(sum(stat.count_diff for stat in retained)),
+    }
+
+
+def steering_sweep(simulator, compute):
+    # Each call steers to the next angle so that only re-steering is measured
+    angles = iter(np.tile(np.arange(-90, 91, 7), 1000))
+
+    def run():
+        simulator.set_beam_angle(next(angles))
+        return compute()
+    return run
+
+
+def suite_cases(args):
+    # (name, callable) for every point of the benchmark matrix
+    for array_type in ('linear', 'curved'):
+        for num_elements in args.elements:
+            simulator = make_simulator(num_elements, array_type)
+            tag = f'{array_type}-{num_elements}'
+            yield f'get_element_positions[{tag}]', simulator.get_element_positions
+            yield f'compute_beam_profile[{tag}]', steering_sweep(simulator, simulator.compute_beam_profile)
+            for grid_size in args.grids:
+                yield (f'compute_interference_map[{tag}-{grid_size}]',
+                       steering_sweep(simulator, lambda s=simulator, g=grid_size: s.compute_interference_map(g)))
+                cold = make_simulator(num_elements, array_type)
+                cold.basis_budget = 0
+                yield (f'compute_interference_map_streaming[{tag}-{grid_size}]',
+                       lambda s=cold, g=grid_size: s.compute_interference_map(g))
+
+    for name, simulator in scenario_simulators():
+        tag = name.lower().replace(' ', '_')
+        yield f'compute_beam_profile[{tag}]', steering_sweep(simulator, simulator.compute_beam_profile)
+        yield f'compute_interference_map[{tag}]', steering_sweep(simulator, simulator.compute_interference_map)
+
+
+def qt_suite_cases(args):
+    # The full UI path: input event, background computation and repaint of
+    # all three views, run in an offscreen window
+    app, window = make_offscreen_app()
+    cases = []
+    for num_elements in args.elements:
+        angles = iter(np.tile(np.arange(-90, 91), 1000))
+
+        def update(num_elements=num_elements, angles=angles):
+            window.num_elements_spin.setValue(num_elements)
+            frames = window.latency.frames
+            window.beam_angle_slider.setValue(int(next(angles)))
+            while window.latency.frames == frames:
+                app.processEvents()
+        cases.append((f'update_visualization[offscreen-{num_elements}]', update))
+    return cases, window
+
+
+# Differences below these are measurement noise, whatever the ratio
+NOISE_FLOOR = {'min_s': 2e-4, 'peak_bytes': 64 * 2**10}
+
+
+def compare_results(results, baseline, threshold):
+    # Cases slower or hungrier than the baseline by more than threshold. The
+    # best run time is compared, it is the least sensitive to system noise.
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric, noise in NOISE_FLOOR.items():
+            if (current[metric] > reference[metric] * (1 + threshold)
+                    and current[metric] - reference[metric] > noise):
+                regressions.append((name, metric, reference[metric], current[metric]))
+    return regressions
+
+
+def bench_suite(args):
+    cases = list(suite_cases(args))
+    window = None
+    if not args.skip_qt:
+        qt_cases, window = qt_suite_cases(args)
+        cases += qt_cases
+
+    results = {}
+    print(f"{'case':<58}{'median [ms]':>13}{'peak [MiB]':>12}{'retained [KiB]':>16}")
+    for name, func in cases:
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure_case(func, args.repeat)
+        result = results[name]
+        print(f"{name:<58}{result['median_s'] * 1e3:>13.2f}{result['peak_bytes'] / 2**20:>12.2f}"
+              f"{result['retained_bytes'] / 2**10:>16.1f}")
+    if window is not None:
+        window.close()
+
+    report = {
+        'machine': {'python': sys.version.split()[0], 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, args.threshold)
+        for name, metric, reference, current in regressions:
+            print(f"REGRESSION {name} {metric}: {reference:.4g} -> {current:.4g} ({current / reference - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Beamforming simulator benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    beam_parser = subparsers.add_parser('beam-profile', help='compute_beam_profile against the scalar reference')
+    beam_parser.add_argument('--elements', type=int, nargs='+', default=[8, 64, 128, 256])
+    beam_parser.add_argument('--array-types', nargs='+', default=['linear', 'curved'])
+    beam_parser.add_argument('--repeat', type=int, default=5)
+    beam_parser.set_defaults(func=bench_beam_profile)
+
+    map_parser = subparsers.add_parser('interference-map', help='compute_interference_map time and peak RSS')
+    map_parser.add_argument('--grids', type=int, nargs='+', default=[400, 2000])
+    map_parser.add_argument('--elements', type=int, nargs='+', default=[8, 64, 256])
+    map_parser.add_argument('--dtypes', nargs='+', default=['complex128', 'complex64'])
+    map_parser.add_argument('--array-types', nargs='+', default=['linear', 'curved'])
+    map_parser.add_argument('--basis-budget-mib', type=int, default=0)
+    map_parser.set_defaults(func=bench_interference_map)
+
+    precision_parser = subparsers.add_parser('precision', help='single vs double precision accuracy in dB')
+    precision_parser.set_defaults(func=bench_precision)
+
+    cache_parser = subparsers.add_parser('cache', help='beam angle sweeps served through CachedSimulator')
+    cache_parser.add_argument('--num-elements', type=int, default=64)
+    cache_parser.add_argument('--max-mib', type=int, default=256)
+    cache_parser.add_argument('--sweeps', type=int, default=2)
+    cache_parser.set_defaults(func=bench_cache)
+
+    steering_parser = subparsers.add_parser('steering', help='re-steering cost with the cached field basis')
+    steering_parser.add_argument('--elements', type=int, nargs='+', default=[16, 64, 256])
+    steering_parser.add_argument('--precisions', nargs='+', default=['double', 'single'])
+    steering_parser.add_argument('--basis-budget-mib', type=int, default=768)
+    steering_parser.add_argument('--display-size', type=int, nargs=2, default=[917, 263],
+                                 help='map view size in pixels, width and height as passed by the app')
+    steering_parser.add_argument('--preview-basis-fraction', type=float, default=0.1)
+    steering_parser.set_defaults(func=bench_steering)
+
+    soak_parser = subparsers.add_parser('soak', help='long-run interference view updates in an offscreen window')
+    soak_parser.add_argument('--updates', type=int, default=5000)
+    soak_parser.add_argument('--block', type=int, default=500)
+    soak_parser.add_argument('--num-elements', type=int, default=16)
+    soak_parser.set_defaults(func=bench_soak)
+
+    scan_parser = subparsers.add_parser('scan', help='batched multi-angle evaluation against per-angle calls')
+    scan_parser.add_argument('--lines', type=int, default=181)
+    scan_parser.add_argument('--elements', type=int, nargs='+', default=[32, 128])
+    scan_parser.add_argument('--array-types', nargs='+', default=['linear', 'curved'])
+    scan_parser.set_defaults(func=bench_scan)
+
+    fft_parser = subparsers.add_parser('fft', help='FFT beam profile engine against direct summation')
+    fft_parser.add_argument('--elements', type=int, nargs='+', default=[64, 256, 1024, 4096])
+    fft_parser.add_argument('--resolutions', type=int, nargs='+', default=[1000, 10000])
+    fft_parser.add_argument('--repeat', type=int, default=5)
+    fft_parser.add_argument('--max-manifold-mib', type=int, default=1024,
+                            help='skip direct summation when its manifold would be larger')
+    fft_parser.set_defaults(func=bench_fft)
+
+    parallel_parser = subparsers.add_parser('parallel', help='interference map scaling with worker threads')
+    parallel_parser.add_argument('--elements', type=int, nargs='+', default=[256])
+    parallel_parser.add_argument('--grids', type=int, nargs='+', default=[1000])
+    parallel_parser.add_argument('--workers', type=int, nargs='+', default=None,
+                                 help='worker counts to run, 1, 2, 4 and all cores by default')
+    parallel_parser.add_argument('--repeat', type=int, default=3)
+    parallel_parser.set_defaults(func=bench_parallel)
+
+    jit_parser = subparsers.add_parser('jit', help='NumPy against the optional numba backend')
+    jit_parser.add_argument('--elements', type=int, nargs='+', default=[64, 256])
+    jit_parser.add_argument('--grids', type=int, nargs='+', default=[400, 1000])
+    jit_parser.add_argument('--repeat', type=int, default=5)
+    jit_parser.set_defaults(func=bench_jit)
+
+    startup_parser = subparsers.add_parser('startup', help='import time and time to first frame of the app')
+    startup_parser.add_argument('--runs', type=int, default=5)
+    startup_parser.add_argument('--top', type=int, default=10, help='number of slowest imports to list')
+    startup_parser.add_argument('--target-ms', type=float, default=1500)
+    startup_parser.set_defaults(func=bench_startup)
+
+    scenarios_parser = subparsers.add_parser('scenarios', help='scenario catalog scan, refresh and lookups')
+    scenarios_parser.add_argument('--count', type=int, default=1000)
+    scenarios_parser.set_defaults(func=bench_scenarios)
+
+    planar_parser = subparsers.add_parser('planar', help='planar array (u, v) patterns and Fresnel volumes')
+    planar_parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32])
+    planar_parser.add_argument('--uv', type=int, default=512)
+    planar_parser.add_argument('--volume', type=int, default=256)
+    planar_parser.add_argument('--near', type=float, default=20, help='nearest axial distance of the volume, in m')
+    planar_parser.add_argument('--precision', choices=['double', 'single'], default='single')
+    planar_parser.set_defaults(func=bench_planar)
+
+    wideband_parser = subparsers.add_parser('wideband', help='pulse energy maps against the number of frequency bins')
+    wideband_parser.add_argument('--elements', type=int, nargs='+', default=[16, 64])
+    wideband_parser.add_argument('--bins', type=int, nargs='+', default=[1, 4, 16, 64])
+    wideband_parser.add_argument('--grid', type=int, default=400)
+    wideband_parser.add_argument('--steering', choices=['phase', 'delay'], default='delay')
+    wideband_parser.add_argument('--max-loop-bins', type=int, default=16,
+                                 help='largest bin count also timed as a loop of narrowband maps')
+    wideband_parser.add_argument('--repeat', type=int, default=3)
+    wideband_parser.set_defaults(func=bench_wideband)
+
+    faults_parser = subparsers.add_parser('faults', help='incremental map updates when an element fails')
+    faults_parser.add_argument('--elements', type=int, nargs='+', default=[64, 256])
+    faults_parser.add_argument('--grid', type=int, default=400)
+    faults_parser.add_argument('--taper', choices=['uniform', 'hamming', 'chebyshev', 'taylor'], default='taylor')
+    faults_parser.add_argument('--repeat', type=int, default=5)
+    faults_parser.set_defaults(func=bench_faults)
+
+    suite_parser = subparsers.add_parser('suite', help='full benchmark matrix with baselines and regression checks')
+    suite_parser.add_argument('--elements', type=int, nargs='+', default=[8, 64, 256])
+    suite_parser.add_argument('--grids', type=int, nargs='+', default=[200, 400])
+    suite_parser.add_argument('--repeat', type=int, default=5)
+    suite_parser.add_argument('--filter', default=None, help='only run cases whose name contains this text')
+    suite_parser.add_argument('--skip-qt', action='store_true', help='leave out the offscreen UI cases')
+    suite_parser.add_argument('--save', default=None, help='write the results as a JSON baseline')
+    suite_parser.add_argument('--compare', default=None, help='baseline JSON to check for regressions')
+    suite_parser.add_argument('--threshold', type=float, default=0.25,
+                              help='allowed relative slowdown or memory growth')
+    suite_parser.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from beam_simulator import BeamformingSimulator
+from simulation_cache import CachedSimulator
+
+# scan is None for a single frame, otherwise the beam angles and target fps
+# of a continuous scan. Results of a scan carry their ScanFrame.
+SimulationRequest = namedtuple('SimulationRequest', ['generation', 'parameters', 'grid', 'submitted_at', 'scan'],
+                               defaults=(None,))
+SimulationResult = namedtuple('SimulationResult', ['request', 'beam_profile', 'interference', 'compute_time', 'frame'],
+                              defaults=(None,))
+
+
+class SimulationWorker(QThread):
+    # Computes simulator results off the UI thread. Only the most recent
+    # request matters: a new submission replaces any request still waiting,
+    # and a result that was overtaken while computing is never emitted.
+    result_ready = pyqtSignal(object)
+    # A request that raised: its generation and the error message
+    request_failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # The worker owns its simulator, the UI only hands over parameters
+        self.simulator = BeamformingSimulator()
+        self.cached_simulator = CachedSimulator(self.simulator)
+        self._condition = threading.Condition()
+        self._pending = None
+        self._running = True
+        self.latest_generation = 0
+        self.dropped_requests = 0
+        self.discarded_results = 0
+        # Scan frames emitted but not yet taken by the UI, at most
+        # frames_in_flight. The scan waits for a free slot before computing
+        # the next frame, and the frames whose time passes meanwhile are
+        # dropped by the scan itself.
+        self.frames_in_flight = 2
+        self._frame_slots = threading.Semaphore(self.frames_in_flight)
+        self._scan_generation = None
+
+    def submit(self, parameters, grid=None, scan=None):
+        # grid holds compute_interference_map's grid_size, x_range and
+        # y_range, the simulator defaults are used when it is None. Any
+        # submission ends a running scan.
+        with self._condition:
+            self.latest_generation += 1
+            if self._pending is not None:
+                self.dropped_requests += 1
+            self._pending = SimulationRequest(self.latest_generation, parameters, grid or {}, time.perf_counter(), scan)
+            self._condition.notify()
+            return self.latest_generation
+
+    def start_scan(self, parameters, beam_angles, fps, grid=None):
+        # Cycle through beam_angles at fps until the next submission
+        return self.submit(parameters, grid, {'beam_angles': beam_angles, 'fps': fps})
+
+    def frame_consumed(self, generation):
+        # Called by the UI for every scan result it received
+        if generation == self._scan_generation:
+            self._frame_slots.release()
+
+    def is_current(self, generation):
+        return generation == self.latest_generation
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                request, self._pending = self._pending, None
+
+            try:
+                self.run_request(request)
+            except Exception as error:
+                # A bad request only loses its own frame, the worker keeps
+                # serving the next ones
+                traceback.print_exc()
+                self.request_failed.emit(request.generation, f'{type(error).__name__}: {error}')
+
+    def run_request(self, request):
+        if request.scan is not None:
+            self.run_scan(request)
+            return
+
+        start = time.perf_counter()
+        self.simulator.set_parameters(request.parameters)
+        beam_profile = self.cached_simulator.compute_beam_profile()
+        interference = self.cached_simulator.compute_interference_map(**request.grid)
+
+        if not self.is_current(request.generation):
+            # A newer request arrived while computing, it will replace this one
+            self.discarded_results += 1
+            return
+        self.result_ready.emit(SimulationResult(request, beam_profile, interference, time.perf_counter() - start))
+
+    def run_scan(self, request):
+        # The scan frames bypass the result cache, their buffers are reused
+        self._frame_slots = threading.Semaphore(self.frames_in_flight)
+        self._scan_generation = request.generation
+        self.simulator.set_parameters(request.parameters)
+        frames = self.simulator.iter_scan(request.scan['beam_angles'], repeat=True, fps=request.scan['fps'],
+                                          buffers=self.frames_in_flight + 1, **request.grid)
+        try:
+            while self._running and self.is_current(request.generation):
+                if not self._frame_slots.acquire(timeout=0.05):
+                    continue
+                frame = next(frames)
+                self.result_ready.emit(SimulationResult(
+                    request, frame.beam_profile, frame.interference, frame.compute_time, frame))
+        finally:
+            frames.close()
+            self._scan_generation = None
+
+
+class LatencyTracker:
+    # Rolling window of input-to-frame latencies, in seconds
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.frames = 0
+
+    def record(self, latency):
+        self.samples.append(latency)
+        self.frames += 1
+
+    def stats(self):
+        if not self.samples:
+            return {'frames': self.frames, 'last': 0.0, 'p50': 0.0, 'p95': 0.0}
+        samples = np.array(self.samples)
+        return {
+            'frames': self.frames,
+            'last': samples[-1],
+            'p50': np.percentile(samples, 50),
+            'p95': np.percentile(samples, 95),
+        }
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    # Shared do-nothing context manager handed out while disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    # Per-stage timers, counters and rolling timing windows. While disabled,
+    # stage() returns a shared no-op context and nothing is recorded, so the
+    # hooks can stay in the hot paths.
+    def __init__(self, enabled=False, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.timings = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        samples = self.timings.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.timings.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+    def histogram(self, name, bins=None):
+        # Counts of the rolling window over log-spaced bins, 10 µs to 10 s
+        bins = np.logspace(-5, 1, 19) if bins is None else bins
+        counts, edges = np.histogram(np.array(self.timings.get(name, ())), bins=bins)
+        return counts, edges
+
+    def summary(self):
+        stages = {}
+        for name, samples in list(self.timings.items()):
+            samples = np.array(samples)
+            if len(samples) == 0:
+                continue
+            stages[name] = {
+                'count': len(samples),
+                'mean': float(samples.mean()),
+                'p50': float(np.percentile(samples, 50)),
+                'p95': float(np.percentile(samples, 95)),
+                'max': float(samples.max()),
+                'histogram': self.histogram(name)[0].tolist(),
+            }
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+    def format_summary(self):
+        # Compact text for the on-screen overlay
+        summary = self.summary()
+        lines = [f"{'stage':<32}{'p50 ms':>9}{'p95 ms':>9}"]
+        for name, stats in sorted(summary['stages'].items()):
+            lines.append(f"{name:<32}{stats['p50'] * 1e3:>9.2f}{stats['p95'] * 1e3:>9.2f}")
+        for name, value in sorted(summary['counters'].items()):
+            lines.append(f"{name:<32}{value:>18}")
+        return '\n'.join(lines)
+
+    def export(self, filepath):
+        # Append one JSON line with the current summary for offline analysis
+        record = dict(self.summary(), timestamp=time.time(),
+                      histogram_edges=self.histogram('')[1].tolist())
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(record) + '\n')
@@ -1,29 +1,30 @@
+import os
 import sys
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, 
-                             QTabWidget, QSlider, QLabel, QComboBox, QPushButton, 
-                             QSpinBox, QGridLayout, QGroupBox, QDoubleSpinBox)
-from PyQt5.QtCore import Qt
 import pyqtgraph as pg
-from PyQt5.QtGui import QIcon, QColor
-import numpy as np
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, 
-                             QTabWidget, QSlider, QLabel, QComboBox, QPushButton, 
+from PyQt5.QtCore import Qt, QTimer, QRectF
+from PyQt5.QtGui import QIcon, QColor, QFont
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
+                             QSlider, QLabel, QComboBox, QPushButton, QCheckBox,
                              QSpinBox, QGridLayout, QGroupBox, QDoubleSpinBox)
-from PyQt5.QtCore import Qt
-import pyqtgraph as pg
-from PyQt5.QtGui import QIcon, QColor
 
-from beam_simulator import BeamformingSimulator
+from beam_simulator import BeamformingSimulator, scan_angles
+from compute_worker import SimulationWorker, LatencyTracker
+from instrumentation import Instrumentation
 from scenario_manager import ScenarioManager
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from beam_simulator import BeamformingSimulator
-from scenario_manager import ScenarioManager
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+
+class PopupRefreshComboBox(QComboBox):
+    # Combo box that calls before_popup() right before its list is shown
+    def __init__(self, before_popup, parent=None):
+        super().__init__(parent)
+        self.before_popup = before_popup
+
+    def showPopup(self):
+        self.before_popup()
+        super().showPopup()
+
 
 class BeamformingApp(QMainWindow):
     def __init__(self):
@@ -31,11 +32,7 @@ class BeamformingApp(QMainWindow):
         self.setWindowTitle('Beamforming Simulator')
         self.setWindowIcon(QIcon("imgs/logo.png"))
         self.setGeometry(100, 100, 1400, 800)
-        self.setWindowTitle('Beamforming Simulator')
-        self.setWindowIcon(QIcon("imgs/logo.png"))
-        self.setGeometry(100, 100, 1400, 800)
 
-        # Central widget and main layout
         # Central widget and main layout
         central_widget = QWidget()
         main_layout = QHBoxLayout()
@@ -47,8 +44,11 @@ class BeamformingApp(QMainWindow):
         # Scenario Selector
         scenario_group = QGroupBox("Scenario")
         scenario_layout = QVBoxLayout()
-        self.scenario_combo = QComboBox()
-        self.scenario_combo.addItems(['Choose Scenario','5G Beamforming', 'Ultrasound Imaging', 'Tumor Ablation'])
+        # Scenarios come from the catalog index, loading one does not touch
+        # disk. The directory is re-checked whenever the list is opened.
+        self.scenario_manager = ScenarioManager()
+        self.scenario_combo = PopupRefreshComboBox(self.refresh_scenarios)
+        self.scenario_combo.addItems(['Choose Scenario'] + self.scenario_manager.list_scenarios())
         self.scenario_combo.currentIndexChanged.connect(self.load_scenario)
         scenario_layout.addWidget(self.scenario_combo)
         scenario_group.setLayout(scenario_layout)
@@ -103,6 +103,13 @@ class BeamformingApp(QMainWindow):
         array_layout.addWidget(QLabel('Array Geometry:'), 3, 0)
         array_layout.addWidget(self.array_type_combo, 3, 1)
 
+        # Amplitude taper across the elements
+        self.taper_combo = QComboBox()
+        self.taper_combo.addItems(['Uniform', 'Hamming', 'Chebyshev', 'Taylor'])
+        self.taper_combo.currentIndexChanged.connect(self.update_taper)
+        array_layout.addWidget(QLabel('Taper:'), 4, 0)
+        array_layout.addWidget(self.taper_combo, 4, 1)
+
         # self.curvature_radius_spin = QDoubleSpinBox()
         # self.curvature_radius_spin.setRange(1, 50)
         # self.curvature_radius_spin.setValue(10)
@@ -129,9 +136,26 @@ class BeamformingApp(QMainWindow):
         self.beam_angle_slider.setValue(0)
         self.beam_angle_label = QLabel('Beam Angle: 0 degrees')
         self.beam_angle_slider.valueChanged.connect(self.update_beam_angle)
+        # Dragging shows coarse previews, the full map follows on release
+        self.beam_angle_slider.sliderReleased.connect(self.refine_visualization)
+
+        # Continuous scan through the scenario's beam angle range
+        self.scan_button = QPushButton('Scan')
+        self.scan_button.setCheckable(True)
+        self.scan_button.toggled.connect(self.toggle_scan)
+        self.scan_fps_spin = QSpinBox()
+        self.scan_fps_spin.setRange(1, 60)
+        self.scan_fps_spin.setValue(20)
+        self.scan_fps_spin.valueChanged.connect(self.update_scan_fps)
+        self.scan_range = (self.beam_angle_slider.minimum(), self.beam_angle_slider.maximum())
+        scan_layout = QHBoxLayout()
+        scan_layout.addWidget(self.scan_button)
+        scan_layout.addWidget(QLabel('Target FPS:'))
+        scan_layout.addWidget(self.scan_fps_spin)
 
         beam_layout.addWidget(self.beam_angle_label)
         beam_layout.addWidget(self.beam_angle_slider)
+        beam_layout.addLayout(scan_layout)
         beam_group.setLayout(beam_layout)
         param_layout.addWidget(beam_group)
 
@@ -145,11 +169,32 @@ class BeamformingApp(QMainWindow):
         self.array_view.setBackground(QColor("#2E3440"))  # Dark background
         self.array_view.getAxis('left').setPen(color="#D8DEE9")  # Light text color
         self.array_view.getAxis('bottom').setPen(color="#D8DEE9")
+        self.array_view.setLabel('bottom', 'X Position', units='λ')
+        self.array_view.setLabel('left', 'Y Position', units='λ')
+        # Element markers, moved in place when the array changes. Clicking
+        # an element marks it failed, clicking it again restores it.
+        self.array_scatter = pg.ScatterPlotItem(symbol='o', size=10, brush='red')
+        self.array_scatter.sigClicked.connect(self.toggle_element_fault)
+        self.array_view.addItem(self.array_scatter)
 
         array_viz_layout.addWidget(self.array_view)
         array_viz_group.setLayout(array_viz_layout)
         param_layout.addWidget(array_viz_group)
 
+        # Diagnostics Group
+        diagnostics_group = QGroupBox("Diagnostics")
+        diagnostics_layout = QVBoxLayout()
+
+        self.stats_overlay_check = QCheckBox('Show Performance Overlay')
+        self.stats_overlay_check.toggled.connect(self.toggle_stats_overlay)
+        self.export_stats_button = QPushButton('Export Stats')
+        self.export_stats_button.clicked.connect(self.export_stats)
+
+        diagnostics_layout.addWidget(self.stats_overlay_check)
+        diagnostics_layout.addWidget(self.export_stats_button)
+        diagnostics_group.setLayout(diagnostics_layout)
+        param_layout.addWidget(diagnostics_group)
+
         # Stretch to push everything up
         param_layout.addStretch(1)
 
@@ -168,6 +213,24 @@ class BeamformingApp(QMainWindow):
         self.interference_view.setBackground(QColor("#2E3440"))  # Dark background
         self.interference_view.getAxis('left').setPen(color="#D8DEE9")  # Light text color
         self.interference_view.getAxis('bottom').setPen(color="#D8DEE9")
+        # One persistent image, its pixels are replaced on every update
+        self.interference_image = pg.ImageItem()
+        colormap = pg.colormap.get('viridis')  # Change to 'viridis', 'inferno', etc., if desired
+        self.interference_image.setLookupTable(colormap.getLookupTable())
+        self.interference_image.setLevels([0, 1])  # Set normalized levels
+        self.interference_view.addItem(self.interference_image)
+        self.interference_buffer = None
+        # The map is drawn transposed: the array lies along the horizontal
+        # axis and the beam points up. The grid follows the visible region,
+        # so the view range is fixed instead of following the image.
+        self.interference_view.setLabel('bottom', 'Lateral Position', units='m')
+        self.interference_view.setLabel('left', 'Axial Position', units='m')
+        self.interference_view.setRange(xRange=(-20, 20), yRange=(-20, 20), padding=0)
+        self.interference_view.getViewBox().disableAutoRange()
+        # Fraction of the display resolution used for drag previews
+        self.preview_scale = 0.25
+        # Share of the simulator basis_budget given to the preview grid basis
+        self.preview_basis_fraction = 0.1
         viz_layout.addWidget(self.interference_view, stretch=1)
         # Beam Profile View
         viz_layout.addWidget(QLabel('Beam Profile'), stretch=0)
@@ -177,6 +240,13 @@ class BeamformingApp(QMainWindow):
         self.beam_profile_view.setBackground(QColor("#2E3440"))  # Dark background
         self.beam_profile_view.getAxis('left').setPen(color="#D8DEE9")  # Light text color
         self.beam_profile_view.getAxis('bottom').setPen(color="#D8DEE9")
+        self.beam_profile_view.setLabel('bottom', 'X Position (Horizontal)')
+        self.beam_profile_view.setLabel('left', 'Y Position (Vertical)')
+        # The polar grid is static, the profile curve is updated in place
+        self.polar_grid_items = []
+        self.polar_grid_radius = None
+        self.build_polar_grid(1.0)
+        self.beam_profile_curve = self.beam_profile_view.plot(pen=pg.mkPen(color='cyan', width=2))
         viz_layout.addWidget(self.beam_profile_view, stretch=1)
 
         # Set layout to the right panel widget
@@ -189,12 +259,50 @@ class BeamformingApp(QMainWindow):
 
         # Initialize Simulator
         self.simulator = BeamformingSimulator()
-        self.scenario_manager = ScenarioManager()
+        self.simulator.num_elements = self.num_elements_spin.value()
+
+        # Per-stage timings shared by the UI and the worker's simulator. They
+        # are collected while the overlay is shown or when
+        # BEAMFORMING_INSTRUMENTATION=1 is set.
+        self.instrumentation = Instrumentation(enabled=os.environ.get('BEAMFORMING_INSTRUMENTATION') == '1')
+        self.stats_export_path = 'instrumentation_stats.jsonl'
+        for view, name in ((self.interference_view, 'interference'),
+                           (self.beam_profile_view, 'beam_profile'),
+                           (self.array_view, 'array')):
+            self.instrument_paint(view, name)
+
+        # Performance overlay drawn over the interference map
+        self.stats_overlay = QLabel(self.interference_view)
+        self.stats_overlay.setFont(QFont('Monospace', 8))
+        self.stats_overlay.setStyleSheet('background-color: rgba(46, 52, 64, 200); color: #D8DEE9; padding: 4px;')
+        self.stats_overlay.move(10, 10)
+        self.stats_overlay.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.update_stats_overlay)
+
+        # Simulations run on a background thread, only the newest result is drawn
+        self.worker = SimulationWorker(self)
+        self.worker.simulator.instrumentation = self.instrumentation
+        self.worker.result_ready.connect(self.display_results)
+        self.worker.request_failed.connect(self.show_simulation_error)
+        self.worker.start()
+        self.latency = LatencyTracker()
+        # Intervals between displayed scan frames
+        self.scan_intervals = LatencyTracker()
+        self.last_scan_frame = None
+
+        # Pan and zoom recompute the visible region once they settle
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(200)
+        self.refine_timer.timeout.connect(self.refine_visualization)
+        self.interference_view.getViewBox().sigRangeChanged.connect(self.refine_timer.start)
+
+        # The first simulation is requested once the window is on screen
+        self.first_frame_requested = False
 
     def update_array_visualization(self):
-        # Clear previous visualization
-        self.array_view.clear()
-
         # Get current array parameters
         num_elements = self.num_elements_spin.value()
         element_spacing = self.element_spacing_spin.value()
@@ -218,18 +326,34 @@ class BeamformingApp(QMainWindow):
             x_positions = curvature_radius * np.cos(theta)
             y_positions = curvature_radius * np.sin(theta)
 
-        # Plot elements
-        scatter = pg.ScatterPlotItem(x_positions, y_positions, 
-                                     symbol='o', 
-                                     size=10, 
-                                     brush='red')
-        self.array_view.addItem(scatter)
-
-        self.array_view.setLabel('bottom', 'X Position', units='λ')
-        self.array_view.setLabel('left', 'Y Position', units='λ')
+        # Plot elements, failed ones greyed out
+        failed = set(self.simulator.failed_elements)
+        brushes = ['#4C566A' if index in failed else 'red' for index in range(num_elements)]
+        self.array_scatter.setData(x_positions, y_positions, brush=brushes)
 
     def update_array_elements(self):
         self.simulator.num_elements = self.num_elements_spin.value()        
+        # Element indices refer to the old array
+        self.simulator.failed_elements = ()
+        self.simulator.element_weights = None
+        self.update_visualization()
+
+    def update_taper(self):
+        self.simulator.taper = self.taper_combo.currentText().lower()
+        self.update_visualization()
+
+    def toggle_element_fault(self, scatter, points, *args):
+        if not len(points):
+            return
+        if self.simulator.array_type == 'curved':
+            # The scatter and the beam profile place curved elements on an
+            # arc, the maps on a full circle, so a clicked index would fail a
+            # different element in the map
+            self.statusBar().showMessage('Element faults can only be toggled on linear arrays')
+            return
+        index = points[0].index()
+        self.simulator.set_element_failed(index, index not in self.simulator.failed_elements)
+        # Only this element's contribution is recomputed by the worker
         self.update_visualization()
 
     def update_element_spacing(self):
@@ -247,6 +371,8 @@ class BeamformingApp(QMainWindow):
             self.simulator.array_type = 'curved'
             # Set curvature radius in the simulator if supported
             self.simulator.curvature_radius = (self.num_elements_spin.value() - 1) * self.element_spacing_spin.value() / np.pi
+            # Faults cannot be toggled on curved arrays, clear the linear ones
+            self.simulator.failed_elements = ()
         
         self.update_visualization()
 
@@ -270,7 +396,23 @@ class BeamformingApp(QMainWindow):
         self.simulator.element_spacing = self.simulator.wavelength / 2        
         self.update_visualization()
         
+    def refresh_scenarios(self):
+        # Pick up added, edited and removed scenario files. Only the stat
+        # calls of a directory scan when nothing changed.
+        if not self.scenario_manager.catalog.refresh():
+            return
+        current = self.scenario_combo.currentText()
+        self.scenario_combo.blockSignals(True)
+        self.scenario_combo.clear()
+        self.scenario_combo.addItems(['Choose Scenario'] + self.scenario_manager.list_scenarios())
+        # Keep the selection if the scenario still exists, without reloading it
+        self.scenario_combo.setCurrentIndex(max(0, self.scenario_combo.findText(current)))
+        self.scenario_combo.blockSignals(False)
+
     def load_scenario(self, index):
+        if index == 0:
+            # The 'Choose Scenario' placeholder
+            return
         scenario = self.scenario_combo.currentText()
         scenario_data = self.scenario_manager.load_scenario(scenario)
         
@@ -299,16 +441,14 @@ class BeamformingApp(QMainWindow):
             else:
                 self.frequency_unit.setCurrentText('Hz')
                 self.frequency_spin.setValue(frequency)
-            
+
+            self.scan_range = tuple(scenario_data['beam_angle_range'])
             self.simulator.frequency = frequency
             self.update_frequency()
             
             self.update_visualization()
 
     def plot_beam_profile(self, beam_profile):
-        # Clear the previous plot
-        self.beam_profile_view.clear()
-
         # Convert polar data to Cartesian coordinates
         theta = np.deg2rad(beam_profile['x'])  # Convert degrees to radians
         mask = (theta >= -np.pi) & (theta <= np.pi)
@@ -321,28 +461,41 @@ class BeamformingApp(QMainWindow):
         x = r * np.cos(theta)
         y = r * np.sin(theta)
 
-        # Plot the beam profile
-        self.beam_profile_view.plot(y, x, pen=pg.mkPen(color='cyan', width=2))
+        # Update the beam profile curve in place
+        self.beam_profile_curve.setData(y, x)
+
+        # The profile is normalized to its peak, so the grid only has to be
+        # rebuilt in the unlikely case that the radius changes
+        max_radius = np.max(r)
+        if np.isfinite(max_radius) and max_radius > 0 and max_radius != self.polar_grid_radius:
+            self.build_polar_grid(max_radius)
+
+    def build_polar_grid(self, max_radius):
+        # Remove the previous grid
+        for item in self.polar_grid_items:
+            self.beam_profile_view.removeItem(item)
+        self.polar_grid_items = []
+        self.polar_grid_radius = max_radius
 
         # Add polar grid for -90° to 90°
-        max_radius = max(r)
         num_circles = 5
         num_angles = 7
+        grid_pen = pg.mkPen(color='gray', style=Qt.DashLine)
 
         # Add concentric circles
+        circle_theta = np.linspace(-np.pi, np.pi, 360)
         for i in range(1, num_circles + 1):
             radius = max_radius * i / num_circles
-            circle_theta = np.linspace(-np.pi, np.pi, 360)
             circle_x = radius * np.cos(circle_theta)
             circle_y = radius * np.sin(circle_theta)
-            self.beam_profile_view.plot(circle_y, circle_x, pen=pg.mkPen(color='gray', style=Qt.DashLine))
+            self.polar_grid_items.append(self.beam_profile_view.plot(circle_y, circle_x, pen=grid_pen))
 
         # Add radial lines
         angles = np.linspace(-np.pi, np.pi, num_angles)
         for angle in angles:
             line_x = [0, max_radius * np.cos(angle)]
             line_y = [0, max_radius * np.sin(angle)]
-            self.beam_profile_view.plot(line_y, line_x, pen=pg.mkPen(color='gray', style=Qt.DashLine))
+            self.polar_grid_items.append(self.beam_profile_view.plot(line_y, line_x, pen=grid_pen))
 
         # Add angle labels
         font = pg.QtGui.QFont("Arial", 8)
@@ -354,11 +507,7 @@ class BeamformingApp(QMainWindow):
             label.setFont(font)
             label.setPos(label_y, label_x)
             self.beam_profile_view.addItem(label)
-
-        # Lock the aspect ratio and set labels
-        self.beam_profile_view.setAspectLocked(True)
-        self.beam_profile_view.setLabel('bottom', 'X Position (Horizontal)')
-        self.beam_profile_view.setLabel('left', 'Y Position (Vertical)')
+            self.polar_grid_items.append(label)
 
     def update_beam_angle(self, angle):
         self.beam_angle_label.setText(f'Beam Angle: {angle} degrees')
@@ -367,31 +516,181 @@ class BeamformingApp(QMainWindow):
 
     def update_visualization(self):
         self.update_array_visualization()
-        # Update beam profile
-        beam_profile = self.simulator.compute_beam_profile()
-        self.plot_beam_profile(beam_profile)
-
-        # Compute interference map
-        interference_data = self.simulator.compute_interference_map()
-        interference_map = interference_data['interference']
-
-        # Handle NaN values in the interference map
-        interference_map = np.nan_to_num(interference_map, nan=0.0)
-
-        # Normalize interference map for visualization
-        min_val, max_val = interference_map.min(), interference_map.max()
-        normalized_map = (interference_map - min_val) / (max_val - min_val)  # Normalize to [0, 1]
+        if self.scan_button.isChecked():
+            # Restart the scan with the new parameters
+            self.start_scan()
+            return
+        # Hand the current parameters to the worker, superseding any request
+        # that has not started yet. While the slider is dragged only a
+        # coarse preview is computed.
+        preview = self.beam_angle_slider.isSliderDown()
+        self.worker.submit(self.simulator.get_parameters(), self.visible_grid(preview))
+
+    def refine_visualization(self):
+        if self.scan_button.isChecked():
+            self.start_scan()
+            return
+        # Full resolution map of the region in view
+        self.worker.submit(self.simulator.get_parameters(), self.visible_grid(preview=False))
+
+    def toggle_scan(self, checked):
+        # The slider is driven by the scan while it runs
+        self.beam_angle_slider.setEnabled(not checked)
+        if checked:
+            self.start_scan()
+        else:
+            self.beam_angle_label.setText(f'Beam Angle: {self.beam_angle_slider.value()} degrees')
+            self.update_visualization()
 
-        # Add color palette and display interference map
-        img_item = pg.ImageItem(normalized_map)
-        colormap = pg.colormap.get('viridis')  # Change to 'viridis', 'inferno', etc., if desired
-        img_item.setLookupTable(colormap.getLookupTable())
-        img_item.setLevels([0, 1])  # Set normalized levels
+    def update_scan_fps(self):
+        # The rate only matters to a running scan, nothing to recompute
+        # otherwise
+        if self.scan_button.isChecked():
+            self.start_scan()
+
+    def start_scan(self):
+        self.scan_intervals = LatencyTracker()
+        self.last_scan_frame = None
+        self.worker.start_scan(self.simulator.get_parameters(), scan_angles(*self.scan_range),
+                               self.scan_fps_spin.value(), self.visible_grid(preview=False))
+
+    def visible_grid(self, preview=False):
+        # Map region and resolution for the current view. Horizontal view
+        # coordinates are the simulator's y axis, vertical ones its x axis.
+        view_box = self.interference_view.getViewBox()
+        (y_min, y_max), (x_min, x_max) = view_box.viewRange()
+        width, height = int(view_box.width()), int(view_box.height())
+        if width < 2 or height < 2:
+            # Not laid out yet
+            width = height = 400
+        scale = self.preview_scale if preview else 1
+        max_size = (max(2, int(width * scale)), max(2, int(height * scale)))
+        x_range, y_range = (x_min, x_max), (y_min, y_max)
+        # The preview and the refined grid share basis_budget, so that both
+        # bases stay cached and every re-steer is a matrix product
+        basis_fraction = self.preview_basis_fraction if preview else 1 - self.preview_basis_fraction
+        grid_size = self.simulator.adaptive_grid_size(x_range, y_range, max_size, basis_fraction=basis_fraction)
+        return {'grid_size': grid_size, 'x_range': x_range, 'y_range': y_range}
+
+    def display_results(self, result):
+        if result.frame is not None:
+            # Frees the slot of this frame, the scan may compute another one
+            self.worker.frame_consumed(result.request.generation)
+        if not self.worker.is_current(result.request.generation):
+            # Outdated by the time it reached the UI thread
+            self.worker.discarded_results += 1
+            self.instrumentation.count('ui.discarded_results')
+            return
+
+        stage = self.instrumentation.stage
+        self.instrumentation.record('worker.compute', result.compute_time)
 
-        # Add the image item to the interference view
-        self.interference_view.addItem(img_item)
-        self.interference_view.setAspectLocked(True)  # Maintain aspect ratio
-        self.interference_view.showGrid(x=True, y=True)  # Show grid for better visualization
+        # Update beam profile
+        with stage('ui.beam_profile_plot'):
+            self.plot_beam_profile(result.beam_profile)
+
+        # Display interference map
+        interference = result.interference
+        self.show_interference_map(interference['interference'], interference['x'], interference['y'])
+
+        if result.frame is not None:
+            self.show_scan_frame(result.frame)
+            return
+
+        # Time from the input event to the finished frame
+        latency = time.perf_counter() - result.request.submitted_at
+        self.latency.record(latency)
+        self.instrumentation.record('ui.frame_latency', latency)
+        self.instrumentation.count('ui.frames')
+        self.show_latency()
+
+    def show_interference_map(self, interference_map, x=None, y=None):
+        stage = self.instrumentation.stage
+
+        # Reuse the display buffer while the map size stays the same
+        if self.interference_buffer is None or self.interference_buffer.shape != interference_map.shape:
+            self.interference_buffer = np.empty(interference_map.shape)
+        normalized_map = self.interference_buffer
+
+        with stage('ui.nan_to_num'):
+            np.copyto(normalized_map, interference_map)
+            # Handle NaN values in the interference map
+            np.nan_to_num(normalized_map, copy=False, nan=0.0)
+
+        with stage('ui.renormalize'):
+            # Normalize interference map for visualization
+            min_val, max_val = normalized_map.min(), normalized_map.max()
+            normalized_map -= min_val
+            normalized_map /= (max_val - min_val) or 1  # Normalize to [0, 1], a flat map stays 0
+
+        with stage('ui.set_image'):
+            self.interference_image.setImage(normalized_map, autoLevels=False)
+            if x is not None and y is not None:
+                # Place the image over the region it was computed for
+                self.interference_image.setRect(QRectF(y[0], x[0], y[-1] - y[0], x[-1] - x[0]))
+
+    def show_simulation_error(self, generation, message):
+        if self.worker.is_current(generation):
+            self.statusBar().showMessage(f'Simulation failed: {message}')
+
+    def show_scan_frame(self, frame):
+        now = time.perf_counter()
+        if self.last_scan_frame is not None:
+            self.scan_intervals.record(now - self.last_scan_frame)
+        self.last_scan_frame = now
+        self.instrumentation.count('ui.scan_frames')
+
+        self.beam_angle_label.setText(f'Beam Angle: {frame.beam_angle:.0f} degrees (scanning)')
+        interval = self.scan_intervals.stats()['p50']
+        self.statusBar().showMessage(
+            f"Scan: {1 / interval if interval else 0:.1f} fps (target {self.scan_fps_spin.value()}) | "
+            f"frame {frame.index}, dropped frames {frame.dropped}, "
+            f"compute {frame.compute_time * 1e3:.0f} ms")
+
+    def show_latency(self):
+        stats = self.latency.stats()
+        self.statusBar().showMessage(
+            f"Frame latency: {stats['last'] * 1e3:.0f} ms "
+            f"(p50 {stats['p50'] * 1e3:.0f} ms, p95 {stats['p95'] * 1e3:.0f} ms) | "
+            f"frames {stats['frames']}, dropped requests {self.worker.dropped_requests}, "
+            f"discarded results {self.worker.discarded_results}")
+
+    def instrument_paint(self, view, name):
+        # Time the Qt paint of a view, the actual rendering of a frame
+        paint_event = view.paintEvent
+
+        def timed_paint_event(event):
+            with self.instrumentation.stage(f'ui.paint.{name}'):
+                paint_event(event)
+        view.paintEvent = timed_paint_event
+
+    def toggle_stats_overlay(self, checked):
+        self.instrumentation.enabled = checked or os.environ.get('BEAMFORMING_INSTRUMENTATION') == '1'
+        self.stats_overlay.setVisible(checked)
+        if checked:
+            self.stats_timer.start()
+            self.update_stats_overlay()
+        else:
+            self.stats_timer.stop()
+
+    def update_stats_overlay(self):
+        self.stats_overlay.setText(self.instrumentation.format_summary())
+        self.stats_overlay.adjustSize()
+
+    def export_stats(self):
+        self.instrumentation.export(self.stats_export_path)
+        self.statusBar().showMessage(f'Performance stats appended to {self.stats_export_path}')
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.first_frame_requested:
+            # Let the window paint before the first map is computed
+            self.first_frame_requested = True
+            QTimer.singleShot(0, self.update_visualization)
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,49 @@
+import math
+
+import numba
+import numpy as np
+
+# Fused kernels for the numba backend of BeamformingSimulator. Each output
+# value is computed in registers, distance -> phase -> complex exponential ->
+# sum, without the full-size temporaries of the NumPy path. The kernels are
+# compiled on their first call for the argument types they receive and the
+# machine code is cached on disk (cache=True), so later launches skip the JIT.
+
+
+@numba.njit(parallel=True, cache=True)
+def accumulate_field(x, y, x_positions, y_positions, weights, k, out):
+    # out[row, column] = sum over elements of
+    # weight * exp(1j * k * distance(element, pixel))
+    for row in numba.prange(len(y)):
+        for column in range(len(x)):
+            real = 0.0
+            imag = 0.0
+            for element in range(len(x_positions)):
+                dx = x[column] - x_positions[element]
+                dy = y[row] - y_positions[element]
+                phase = k * math.sqrt(dx * dx + dy * dy)
+                cos_phase = math.cos(phase)
+                sin_phase = math.sin(phase)
+                weight = weights[element]
+                real += weight.real * cos_phase - weight.imag * sin_phase
+                imag += weight.real * sin_phase + weight.imag * cos_phase
+            out[row, column] = complex(real, imag)
+
+
+@numba.njit(parallel=True, cache=True)
+def array_factor(theta, dx, dy, weights, k, out):
+    # out[steering, angle] = sum over elements of
+    # weights[steering, element] * exp(1j * k * (sin(theta) * dx + cos(theta) * dy))
+    num_steering = weights.shape[0]
+    for angle in numba.prange(len(theta)):
+        sin_theta = math.sin(theta[angle])
+        cos_theta = math.cos(theta[angle])
+        total = np.zeros(num_steering, dtype=np.complex128)
+        for element in range(len(dx)):
+            phase = k * (sin_theta * dx[element] + cos_theta * dy[element])
+            term = complex(math.cos(phase), math.sin(phase))
+            # Every steering row shares the element phase of this angle
+            for steering in range(num_steering):
+                total[steering] += weights[steering, element] * term
+        for steering in range(num_steering):
+            out[steering, angle] = total[steering]
@@ -0,0 +1,163 @@
+import json
+import os
+
+import numpy as np
+
+INDEX_FILENAME = 'index.jsonl'
+METADATA_FILENAME = 'store.json'
+
+
+def parameters_key(parameters):
+    # Canonical, hashable form of an entry's parameters
+    return json.dumps(parameters, sort_keys=True)
+
+
+class ResultsStore:
+    # Append-only store for large numbers of equally shaped arrays.
+    #
+    # Arrays are grouped into streams by (name, shape, dtype). Every stream is
+    # a sequence of fixed-size .npy chunk files holding chunk_size arrays each,
+    # written through np.memmap. index.jsonl has one line per entry with its
+    # parameters and the chunk file and row of each of its arrays. The data is
+    # flushed before the index line is written, so readers may open the store
+    # while a sweep is still appending to it. Reads return read-only memmap
+    # views, nothing is copied or parsed beyond the index.
+    def __init__(self, directory, chunk_size=64, readonly=False):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.readonly = readonly
+        self.entries = []
+        self._keys = {}
+        self._streams = {}
+        self._readers = {}
+        self._writers = {}
+        self._index_file = None
+
+        # The chunk size is fixed when the store is created
+        metadata_path = os.path.join(directory, METADATA_FILENAME)
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                self.chunk_size = json.load(f)['chunk_size']
+        elif not readonly:
+            os.makedirs(directory, exist_ok=True)
+            with open(metadata_path, 'w') as f:
+                json.dump({'chunk_size': chunk_size}, f)
+        self.refresh()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refresh(self):
+        # Pick up entries appended since the index was last read
+        index_path = os.path.join(self.directory, INDEX_FILENAME)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, 'r') as f:
+            lines = f.readlines()
+        for line in lines[len(self.entries):]:
+            if not line.endswith('\n'):
+                # Partially written by a concurrent appender
+                break
+            self._add_entry(json.loads(line))
+
+    def _add_entry(self, entry):
+        self._keys[parameters_key(entry['parameters'])] = len(self.entries)
+        self.entries.append(entry)
+        # Entries are appended in order, so the last one locates the end of
+        # every stream it uses
+        for location in entry['arrays'].values():
+            self._streams[location['stream']] = {'chunks': location['chunk'] + 1, 'rows': location['row'] + 1}
+
+    @staticmethod
+    def stream_name(name, array):
+        shape = 'x'.join(str(size) for size in array.shape) or 'scalar'
+        return f'{name}_{shape}_{array.dtype.name}'
+
+    def _chunk_path(self, stream, chunk):
+        return os.path.join(self.directory, f'{stream}_{chunk:05d}.npy')
+
+    def _write_row(self, name, array):
+        array = np.asarray(array)
+        stream = self.stream_name(name, array)
+        state = self._streams.setdefault(stream, {'chunks': 0, 'rows': 0})
+
+        if state['chunks'] == 0 or state['rows'] == self.chunk_size:
+            # Start a new chunk file
+            state['chunks'] += 1
+            state['rows'] = 0
+            self._close_writer(stream)
+        chunk = state['chunks'] - 1
+
+        writer = self._writers.get(stream)
+        if writer is None:
+            path = self._chunk_path(stream, chunk)
+            if os.path.exists(path):
+                writer = np.load(path, mmap_mode='r+')
+            else:
+                writer = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype,
+                                                   shape=(self.chunk_size,) + array.shape)
+            self._writers[stream] = writer
+
+        writer[state['rows']] = array
+        writer.flush()
+        state['rows'] += 1
+        return {'stream': stream, 'chunk': chunk, 'row': state['rows'] - 1}
+
+    def _close_writer(self, stream):
+        writer = self._writers.pop(stream, None)
+        if writer is not None:
+            writer.flush()
+            del writer
+
+    def append(self, parameters, arrays):
+        # Store one entry and return its id
+        if self.readonly:
+            raise ValueError('Cannot append to a read-only results store')
+        locations = {name: self._write_row(name, array) for name, array in arrays.items()}
+        entry = {'id': len(self.entries), 'parameters': parameters, 'arrays': locations}
+
+        if self._index_file is None:
+            self._index_file = open(os.path.join(self.directory, INDEX_FILENAME), 'a')
+        self._index_file.write(json.dumps(entry) + '\n')
+        self._index_file.flush()
+
+        self._keys[parameters_key(parameters)] = entry['id']
+        self.entries.append(entry)
+        return entry['id']
+
+    def _reader(self, stream, chunk):
+        key = (stream, chunk)
+        if key not in self._readers:
+            self._readers[key] = np.load(self._chunk_path(stream, chunk), mmap_mode='r')
+        return self._readers[key]
+
+    def get_array(self, entry_id, name):
+        location = self.entries[entry_id]['arrays'][name]
+        return self._reader(location['stream'], location['chunk'])[location['row']]
+
+    def get(self, entry_id):
+        # Every array of an entry, as zero-copy views into the chunk files
+        return {name: self.get_array(entry_id, name) for name in self.entries[entry_id]['arrays']}
+
+    def lookup(self, parameters):
+        # Id of the entry stored with exactly these parameters, or None
+        return self._keys.get(parameters_key(parameters))
+
+    def find(self, **criteria):
+        # Ids of the entries whose parameters match all the given values
+        return [entry['id'] for entry in self.entries
+                if all(entry['parameters'].get(name) == value for name, value in criteria.items())]
+
+    def close(self):
+        for stream in list(self._writers):
+            self._close_writer(stream)
+        self._readers.clear()
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
@@ -1,24 +1,169 @@
+import copy
 import json
 import os
 
+# Fields every scenario file must define, with their accepted types
+SCENARIO_FIELDS = {
+    'name': str,
+    'num_elements': int,
+    'frequency': (int, float),
+    'array_type': str,
+    'beam_angle_range': list,
+}
+
+
+def validate_scenario(scenario):
+    # Raises ValueError describing the first problem found
+    if not isinstance(scenario, dict):
+        raise ValueError('a scenario must be a JSON object')
+    for field, types in SCENARIO_FIELDS.items():
+        if field not in scenario:
+            raise ValueError(f"missing field '{field}'")
+        if not isinstance(scenario[field], types) or isinstance(scenario[field], bool):
+            raise ValueError(f"field '{field}' has the wrong type")
+    if scenario['num_elements'] < 1 or scenario['frequency'] <= 0:
+        raise ValueError('num_elements and frequency must be positive')
+    if len(scenario['beam_angle_range']) != 2:
+        raise ValueError("beam_angle_range must be [low, high]")
+
+
+class ScenarioCatalog:
+    # In-memory index of the scenario files in a directory. The directory is
+    # scanned once, lookups and queries are served from memory. refresh()
+    # re-stats the files and only re-parses those whose modification time or
+    # size changed. Files that fail validation are left out and reported in
+    # `errors`.
+    def __init__(self, directory):
+        self.directory = directory
+        self.errors = {}
+        # File name -> (mtime_ns, size, scenario or None)
+        self._files = {}
+        self._by_name = {}
+        self.refresh()
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def refresh(self):
+        # Bring the index up to date, returns True if anything changed
+        changed = False
+        seen = set()
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    cached = self._files.get(entry.name)
+                    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                        continue
+                    self._files[entry.name] = (stat.st_mtime_ns, stat.st_size, self._parse(entry.path, entry.name))
+                    changed = True
+
+        for filename in set(self._files) - seen:
+            del self._files[filename]
+            self.errors.pop(filename, None)
+            changed = True
+
+        if changed:
+            # Scenarios in file name order, the first file wins a duplicate name
+            self._by_name = {}
+            for filename in sorted(self._files):
+                scenario = self._files[filename][2]
+                if scenario is not None:
+                    self._by_name.setdefault(scenario['name'], (filename, scenario))
+        return changed
+
+    def _parse(self, path, filename):
+        try:
+            with open(path, 'r') as f:
+                scenario = json.load(f)
+            validate_scenario(scenario)
+        except (OSError, ValueError) as error:
+            self.errors[filename] = str(error)
+            return None
+        self.errors.pop(filename, None)
+        return scenario
+
+    def names(self):
+        return [name for name, _ in self.index()]
+
+    def index(self):
+        # (name, summary) pairs in file name order
+        return [(name, {
+            'file': filename,
+            'frequency': scenario['frequency'],
+            'num_elements': scenario['num_elements'],
+            'array_type': scenario['array_type'],
+            'beam_angle_range': tuple(scenario['beam_angle_range']),
+        }) for name, (filename, scenario) in sorted(self._by_name.items(), key=lambda item: item[1][0])]
+
+    def get(self, name):
+        # A copy of the named scenario, or None
+        entry = self._by_name.get(name)
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    def query(self, name=None, array_type=None, min_frequency=None, max_frequency=None,
+              min_elements=None, max_elements=None, beam_angle=None):
+        # Scenarios matching every given filter. name matches a substring and
+        # array_type ignores case, beam_angle must lie in beam_angle_range.
+        matches = []
+        for scenario_name, summary in self.index():
+            if name is not None and name.lower() not in scenario_name.lower():
+                continue
+            if array_type is not None and summary['array_type'].lower() != array_type.lower():
+                continue
+            if min_frequency is not None and summary['frequency'] < min_frequency:
+                continue
+            if max_frequency is not None and summary['frequency'] > max_frequency:
+                continue
+            if min_elements is not None and summary['num_elements'] < min_elements:
+                continue
+            if max_elements is not None and summary['num_elements'] > max_elements:
+                continue
+            if beam_angle is not None:
+                low, high = summary['beam_angle_range']
+                if not low <= beam_angle <= high:
+                    continue
+            matches.append(self.get(scenario_name))
+        return matches
+
+
 class ScenarioManager:
     def __init__(self, scenarios_dir='scenarios'):
         self.scenarios_dir = scenarios_dir
         os.makedirs(scenarios_dir, exist_ok=True)
+        self.catalog = ScenarioCatalog(scenarios_dir)
 
     def load_scenario(self, scenario_name):
-        filepath = os.path.join(self.scenarios_dir, f'{scenario_name.lower().replace(" ", "_")}.json')
-        
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
+        scenario = self.catalog.get(scenario_name)
+        if scenario is None and self.catalog.refresh():
+            # Possibly added since the last scan
+            scenario = self.catalog.get(scenario_name)
+        if scenario is None:
             print(f"Scenario {scenario_name} not found.")
-            return None
+        return scenario
 
     def save_scenario(self, scenario_data):
+        validate_scenario(scenario_data)
         filename = scenario_data['name'].lower().replace(' ', '_') + '.json'
         filepath = os.path.join(self.scenarios_dir, filename)
-        
+
         with open(filepath, 'w') as f:
-            json.dump(scenario_data, f, indent=4)
\ No newline at end of file
+            json.dump(scenario_data, f, indent=4)
+        self.catalog.refresh()
+
+    def list_scenarios(self):
+        return self.catalog.names()
+
+    def query(self, **filters):
+        return self.catalog.query(**filters)
+
+    def load_all_scenarios(self):
+        # Every scenario in the directory, sorted by file name
+        self.catalog.refresh()
+        return self.catalog.query()
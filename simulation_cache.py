@@ -0,0 +1,122 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+def result_nbytes(result):
+    # Size of the arrays held by a simulator result dict
+    return sum(value.nbytes for value in result.values() if isinstance(value, np.ndarray))
+
+
+def weights_key(weights):
+    # Hashable stand-in for an element weight vector
+    return None if weights is None else np.asarray(weights, dtype=complex).tobytes()
+
+
+class LRUCache:
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def put(self, key, value, nbytes):
+        if nbytes > self.max_bytes:
+            # Larger than the whole cache, never stored
+            return
+        if key in self.entries:
+            self.current_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, nbytes)
+        self.current_bytes += nbytes
+
+        # Evict least recently used entries until the budget is met
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+class CachedSimulator:
+    # Serves BeamformingSimulator results from memory when the parameters
+    # that affect them have been computed before. The wrapped simulator is
+    # still configured directly, the key is read from it on every call.
+    def __init__(self, simulator, max_bytes=256 * 2**20):
+        self.simulator = simulator
+        self.cache = LRUCache(max_bytes)
+
+    def parameters_key(self):
+        simulator = self.simulator
+        return (
+            simulator.num_elements,
+            simulator.frequency,
+            simulator.element_spacing,
+            simulator.array_type,
+            getattr(simulator, 'curvature_radius', None),
+            simulator.beam_angle,
+            simulator.precision,
+            getattr(simulator, 'profile_resolution', None),
+            getattr(simulator, 'beam_profile_engine', None),
+            getattr(simulator, 'num_rows', None),
+            getattr(simulator, 'row_spacing', None),
+            getattr(simulator, 'elevation_angle', None),
+            getattr(simulator, 'taper', None),
+            getattr(simulator, 'sidelobe_level', None),
+            weights_key(getattr(simulator, 'element_weights', None)),
+            tuple(getattr(simulator, 'failed_elements', ())),
+        )
+
+    def _cached(self, key, compute):
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            # Results are shared between callers, protect them from edits
+            for value in result.values():
+                if isinstance(value, np.ndarray):
+                    value.flags.writeable = False
+            self.cache.put(key, result, result_nbytes(result))
+        return result
+
+    def compute_beam_profile(self):
+        key = ('beam_profile',) + self.parameters_key()
+        return self._cached(key, self.simulator.compute_beam_profile)
+
+    def compute_interference_map(self, grid_size=400, extent=20, dtype=None, x_range=None, y_range=None):
+        grid = (
+            tuple(np.atleast_1d(grid_size)), extent, np.dtype(dtype).name if dtype else None,
+            tuple(x_range) if x_range is not None else None,
+            tuple(y_range) if y_range is not None else None,
+        )
+        key = ('interference_map',) + self.parameters_key() + grid
+        return self._cached(key, lambda: self.simulator.compute_interference_map(grid_size, extent, dtype, x_range, y_range))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()